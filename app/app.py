@@ -1,42 +1,49 @@
 import streamlit as st
 import os
 import sys
+import json
+import hashlib
+import re
+import textwrap
 import tempfile
-from datetime import datetime
+import time
+import threading
 import concurrent.futures
-from PIL import Image
-import io
-import re
+import dataclasses
+from urllib.parse import urlparse
+from functools import lru_cache
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add parent directory to path for imports (Streamlit re-executes this script
+# on every rerun, so only insert the project root once)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
 
 # Import utility modules
 from utils.paper_import import (
-    load_pdf_from_path, 
+    load_pdf_from_bytes,
     load_pdf_from_arxiv, 
     load_pdf_from_url,
-    get_embedded_pdf_viewer,
-    cleanup_temporary_files,
-    PaperContent
+    get_embedded_pdf_viewer
 )
 from utils.ai_analysis import (
     analyze_paper,
     analyze_terminology,
-    get_field_tags,
+    extract_all_sections,
     process_paper_with_parallel_analysis
 )
 from utils.display import (
     display_terminology,
     ProgressManager,
-    extract_ratings_from_text,
-    rating_badge
+    extract_rating_from_text,
+    rating_badge,
+    render_paper_header_html
 )
+from utils.result_cache import get_cached_result, cache_result
 from config import (
-    CUSTOM_CSS,
     UI_SETTINGS,
-    get_api_key,
-    get_model_config,
+    get_custom_css,
     get_analysis_types,
     get_models
 )
@@ -50,7 +57,30 @@ st.set_page_config(
 )
 
 # Apply custom CSS
-st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+st.markdown(get_custom_css(), unsafe_allow_html=True)
+
+# Displayable analysis types and models, filtered from config once per process
+# instead of on every rerun
+ANALYSIS_TYPES = get_analysis_types()
+MODELS = get_models()
+
+# Selectbox labels, built once instead of per option on every rerun
+ANALYSIS_TYPE_LABELS = {
+    k: f"{v['icon']} {v['title']}" for k, v in ANALYSIS_TYPES.items()
+}
+MODEL_LABELS = {
+    k: f"{v['name']} - {v['description']}" for k, v in MODELS.items()
+}
+
+# Published PDFs, served at app/static/pdfs/ when static serving is enabled.
+# Only public (arXiv) papers are published, and files not re-published within
+# two cache lifetimes are swept so the directory can't grow without bound
+PDF_STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "pdfs")
+PDF_CACHE_TTL = 24 * 60 * 60
+PDF_STATIC_TTL = 2 * PDF_CACHE_TTL
+
+# New-style (2303.08774, 2303.08774v2) and old-style (hep-th/9901001) arXiv IDs
+ARXIV_ID_PATTERN = re.compile(r'^(?:\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?$', re.IGNORECASE)
 
 
 def initialize_session_state():
@@ -68,7 +98,8 @@ def initialize_session_state():
         "terminology_loaded": False,
         "last_upload_id": None,
         "tab_index": 0,
-        "analyses_running": False
+        "analyses_running": False,
+        "terminology_future": None
     }
     
     for key, default_value in defaults.items():
@@ -87,26 +118,18 @@ def display_paper_metadata(paper_content):
         
     metadata = paper_content.metadata
     
-    # Paper title
-    st.markdown(f"## {metadata.get('title', 'Unknown Title')}")
-    
-    # Main metadata in 3 columns
-    col1, col2, col3 = st.columns([2, 1, 1])
-    
-    with col1:
-        authors = metadata.get('author', 'Unknown Author')
-        st.markdown(f"**Authors:** {authors}")
-    
-    with col2:
-        st.markdown(f"**Pages:** {paper_content.page_count}")
-        if 'published' in metadata:
-            st.markdown(f"**Published:** {metadata.get('published')}")
-    
-    with col3:
-        if 'arxiv_id' in metadata:
-            st.markdown(f"**arXiv ID:** [{metadata.get('arxiv_id')}](https://arxiv.org/abs/{metadata.get('arxiv_id')})")
-        elif 'url' in metadata:
-            st.markdown(f"**Source:** [Link]({metadata.get('url')})")
+    # Title and metadata row in a single element
+    st.markdown(
+        render_paper_header_html(
+            metadata.get('title', 'Unknown Title'),
+            metadata.get('author', 'Unknown Author'),
+            paper_content.page_count,
+            metadata.get('published'),
+            metadata.get('arxiv_id'),
+            metadata.get('url')
+        ),
+        unsafe_allow_html=True
+    )
     
     # Abstract in expander
     if 'abstract' in metadata and metadata['abstract'] and len(metadata['abstract'].strip()) > 0:
@@ -119,31 +142,42 @@ def display_paper_metadata(paper_content):
         
         # Create field tags with clean styling
         cols = st.columns(3)
-        for i, (tag, info) in enumerate(st.session_state.field_tags.items()):
-            with cols[i % 3]:
-                with st.expander(tag):
-                    st.markdown(f"{info.get('description', '')}")
-                    if 'link' in info and info['link']:
-                        st.markdown(f"[Learn more]({info['link']})")
+        column_tags = [[], [], []]
+        for i, item in enumerate(st.session_state.field_tags.items()):
+            column_tags[i % 3].append(item)
+        
+        for col, items in zip(cols, column_tags):
+            with col:
+                for tag, info in items:
+                    with st.expander(tag):
+                        text = f"{info.get('description', '')}"
+                        if 'link' in info and info['link']:
+                            text += f"\n\n[Learn more]({info['link']})"
+                        st.markdown(text)
     
     st.markdown("---")
 
 
+def on_analysis_type_change():
+    """Sync analysis type from the selector before the triggered rerun starts"""
+    # No st.rerun() here: Streamlit reruns the script after every widget
+    # callback anyway, and calling it inside a callback is a no-op
+    st.session_state.current_analysis_type = st.session_state.analysis_selector
+
+
 def display_analysis_selector(analysis_types, current_type):
     """Display analysis type selector"""
     # Format options for display
     options = list(analysis_types.keys())
     
-    # Create formatted labels for dropdown
-    format_func = lambda x: f"{analysis_types[x]['icon']} {analysis_types[x]['title']}"
-    
     # Display the dropdown
     selected = st.selectbox(
         "Select Analysis Type",
         options,
-        format_func=format_func,
+        format_func=ANALYSIS_TYPE_LABELS.get,
         index=options.index(current_type) if current_type in options else 0,
-        key="analysis_selector"
+        key="analysis_selector",
+        on_change=on_analysis_type_change
     )
     
     # Show description of selected type
@@ -153,20 +187,23 @@ def display_analysis_selector(analysis_types, current_type):
     return selected
 
 
+def on_model_change():
+    """Sync model choice from the selector before the triggered rerun starts"""
+    st.session_state.model_choice = st.session_state.model_selector
+
+
 def display_model_selector(models, current_model):
     """Display model selector"""
     options = list(models.keys())
     
-    # Create formatted labels for dropdown
-    format_func = lambda x: f"{models[x]['name']} - {models[x]['description']}"
-    
     # Display the dropdown
     selected = st.selectbox(
         "Select Model",
         options,
-        format_func=format_func,
+        format_func=MODEL_LABELS.get,
         index=options.index(current_model) if current_model in options else 0,
-        key="model_selector"
+        key="model_selector",
+        on_change=on_model_change
     )
     
     # Warning for Pro model without API key
@@ -176,6 +213,37 @@ def display_model_selector(models, current_model):
     return selected
 
 
+@lru_cache(maxsize=32)
+def extract_sections_cached(raw_analysis):
+    """Split raw analysis text into sections once per distinct text"""
+    return extract_all_sections(raw_analysis)
+
+
+def get_section_ratings(result):
+    """
+    Get the rating found in each section, computed once per result
+    
+    The ratings are kept on the result object itself, so re-rendering an
+    unchanged analysis skips the per-section scan entirely.
+    
+    Args:
+        result: AnalysisResult with sections populated
+        
+    Returns:
+        Dictionary mapping section name to (rating, context)
+    """
+    ratings = getattr(result, "_section_ratings", None)
+    if ratings is None:
+        ratings = {}
+        for section_name, section_text in result.sections.items():
+            section_rating = extract_rating_from_text(section_text)
+            if section_rating:
+                ratings[section_name] = section_rating
+        result._section_ratings = ratings
+    
+    return ratings
+
+
 def display_analysis_results_tabbed(result):
     """Display analysis results in a tabbed interface"""
     if not result or result.error:
@@ -185,16 +253,10 @@ def display_analysis_results_tabbed(result):
     
     # Extract all possible sections from raw analysis if not available directly
     if not result.sections and result.raw_analysis:
-        from utils.ai_analysis import extract_all_sections
-        result.sections = extract_all_sections(result.raw_analysis)
+        result.sections = extract_sections_cached(result.raw_analysis)
     
     # Get ratings from sections
-    ratings = {}
-    for section_name, section_text in result.sections.items():
-        section_ratings = extract_ratings_from_text(section_text)
-        if section_ratings:
-            for rating, context in section_ratings:
-                ratings[section_name] = (rating, context)
+    ratings = get_section_ratings(result)
     
     # Create tabs for different sections
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -217,11 +279,12 @@ def display_analysis_results_tabbed(result):
     with tab2:
         innovations = result.get_section("key_innovations")
         if innovations:
-            # Add rating badge if available
+            # Add rating badge if available (in the same element as the section)
             if "key_innovations" in ratings:
                 rating, context = ratings["key_innovations"]
-                st.markdown(f'<p>Innovation Score: {rating_badge(rating)} {context}</p>', unsafe_allow_html=True)
-            st.markdown(innovations)
+                st.markdown(f'<p>Innovation Score: {rating_badge(rating)} {context}</p>\n\n{innovations}', unsafe_allow_html=True)
+            else:
+                st.markdown(innovations)
         else:
             st.info("No specific innovations section found in the analysis.")
     
@@ -229,11 +292,12 @@ def display_analysis_results_tabbed(result):
     with tab3:
         techniques = result.get_section("techniques")
         if techniques:
-            # Add rating badge if available
+            # Add rating badge if available (in the same element as the section)
             if "techniques" in ratings:
                 rating, context = ratings["techniques"]
-                st.markdown(f'<p>Technical Score: {rating_badge(rating)} {context}</p>', unsafe_allow_html=True)
-            st.markdown(techniques)
+                st.markdown(f'<p>Technical Score: {rating_badge(rating)} {context}</p>\n\n{techniques}', unsafe_allow_html=True)
+            else:
+                st.markdown(techniques)
         else:
             st.info("No specific techniques section found in the analysis.")
     
@@ -241,11 +305,12 @@ def display_analysis_results_tabbed(result):
     with tab4:
         applications = result.get_section("practical_value")
         if applications:
-            # Add rating badge if available
+            # Add rating badge if available (in the same element as the section)
             if "practical_value" in ratings:
                 rating, context = ratings["practical_value"]
-                st.markdown(f'<p>Practical Value: {rating_badge(rating)} {context}</p>', unsafe_allow_html=True)
-            st.markdown(applications)
+                st.markdown(f'<p>Practical Value: {rating_badge(rating)} {context}</p>\n\n{applications}', unsafe_allow_html=True)
+            else:
+                st.markdown(applications)
         else:
             st.info("No specific applications section found in the analysis.")
     
@@ -268,9 +333,8 @@ def display_simplified_analysis(result):
             st.error(f"Error in analysis: {result.error}")
         return
     
-    st.markdown("## Simplified Explanation")
-    st.markdown("---")
-    st.markdown(result.raw_analysis)
+    # Heading, divider and body in one element
+    st.markdown(f"## Simplified Explanation\n\n---\n\n{result.raw_analysis}")
     
     # Display model and timing info as a caption
     st.caption(f"Analysis by {result.model_used} | {result.processing_time:.1f} seconds")
@@ -283,36 +347,356 @@ def display_raw_analysis(result):
             st.error(f"Error in analysis: {result.error}")
         return
     
-    st.markdown("## Raw Analysis")
-    st.markdown("---")
-    st.markdown(result.raw_analysis)
+    # Heading, divider and body in one element
+    st.markdown(f"## Raw Analysis\n\n---\n\n{result.raw_analysis}")
     
     # Display model and timing info as a caption
     st.caption(f"Analysis by {result.model_used} | {result.processing_time:.1f} seconds")
     
     # Add download button for raw analysis
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     st.download_button(
         label="📥 Download as Markdown",
         data=result.raw_analysis,
-        file_name=f"paperbuddy_analysis_{timestamp}.md",
+        file_name=f"{result.file_stem}.md",
         mime="text/markdown"
     )
 
 
+@st.cache_data(ttl=24 * 60 * 60, max_entries=32, show_spinner=False)
+def prepare_json_download(title, authors, analysis_type, model_used, created_at, sections, raw_analysis):
+    """Build the JSON download payload once per analysis instead of on every rerun"""
+    json_data = {
+        "title": title,
+        "authors": authors,
+        "analysis_type": analysis_type,
+        "model_used": model_used,
+        "timestamp": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "sections": sections,
+        "raw_analysis": raw_analysis
+    }
+    
+    return json.dumps(json_data, indent=2)
+
+
+@st.cache_resource(ttl=24 * 60 * 60, max_entries=8, show_spinner=False)
+def load_paper_cached(source_key, _loader, _source):
+    """
+    Load a paper once per source and share the result across reruns and sessions
+    
+    Args:
+        source_key: Stable cache key (content hash, arXiv ID or URL)
+        _loader: Loader function (excluded from hashing)
+        _source: Argument passed to the loader (excluded from hashing)
+        
+    Returns:
+        PaperContent object
+    """
+    return _loader(_source)
+
+
+def load_paper(source_key, loader, source, filename=None):
+    """
+    Load a paper through the shared cache, evicting failed loads
+    
+    The cached PaperContent is shared by every session, so each caller gets a
+    shallow copy with its own metadata dict. Session-specific edits (AI-repaired
+    title/author/abstract, the uploader's file name) then stay in that session.
+    
+    Args:
+        source_key: Stable cache key (content hash, arXiv ID or URL)
+        loader: Loader function
+        source: Argument passed to the loader
+        filename: Optional file name to record in this session's metadata
+        
+    Returns:
+        PaperContent object owned by the calling session
+    """
+    paper_content = load_paper_cached(source_key, loader, source)
+    
+    # Don't keep failed loads around; a retry may well succeed
+    if not paper_content.is_valid:
+        load_paper_cached.clear(source_key, loader, source)
+    
+    paper_content = dataclasses.replace(paper_content, metadata=dict(paper_content.metadata))
+    if filename:
+        paper_content.metadata["filename"] = filename
+    
+    return paper_content
+
+
+@st.cache_data(persist="disk", max_entries=64, show_spinner=False)
+def get_terminology_cached(paper_hash, api_key, _page_images, _metadata):
+    """
+    Extract terminology once per paper and share it across reruns, sessions
+    and app restarts (persisted to disk like the analyses in result_cache)
+
+    Args:
+        paper_hash: Content hash of the paper
+        api_key: Optional API key
+        _page_images: Page images to analyze (excluded from hashing)
+        _metadata: Paper metadata (excluded from hashing)
+
+    Returns:
+        Dictionary of terminology with definitions and explanations
+    """
+    return analyze_terminology(_page_images, _metadata, api_key)
+
+
+def get_terminology(paper_content, api_key):
+    """Extract terminology through the shared cache, evicting failed extractions"""
+    args = (paper_content.content_hash, api_key, paper_content.page_images[:3], paper_content.metadata)
+    terminology = get_terminology_cached(*args)
+
+    # An empty result means the request failed; let the next load retry it
+    if not terminology:
+        get_terminology_cached.clear(*args)
+
+    return terminology
+
+
+def sweep_published_pdfs():
+    """Delete published PDFs that haven't been re-published within PDF_STATIC_TTL"""
+    cutoff = time.time() - PDF_STATIC_TTL
+    
+    for entry in os.scandir(PDF_STATIC_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            pass  # Removed concurrently by another session
+
+
+@st.cache_resource(ttl=PDF_CACHE_TTL, max_entries=64, show_spinner=False)
+def publish_pdf(paper_hash, _pdf_bytes):
+    """
+    Write a PDF into the app's static directory once per cache lifetime
+    
+    Args:
+        paper_hash: Content hash of the paper, used as the file name
+        _pdf_bytes: Raw PDF content (excluded from hashing)
+        
+    Returns:
+        URL the PDF is served from
+    """
+    path = os.path.join(PDF_STATIC_DIR, f"{paper_hash}.pdf")
+    
+    if os.path.exists(path):
+        # Refresh the timestamp so the sweep keeps files that are still in use
+        os.utime(path)
+    else:
+        os.makedirs(PDF_STATIC_DIR, exist_ok=True)
+        sweep_published_pdfs()
+        
+        # Write to a uniquely named temporary file first so the server never
+        # serves a partial PDF and concurrent publishers never share one
+        with tempfile.NamedTemporaryFile(dir=PDF_STATIC_DIR, suffix=".tmp", delete=False) as file:
+            tmp_path = file.name
+            file.write(_pdf_bytes)
+        os.replace(tmp_path, path)
+    
+    return f"app/static/pdfs/{paper_hash}.pdf"
+
+
+@st.cache_resource(ttl=PDF_CACHE_TTL, max_entries=4, show_spinner=False)
+def get_pdf_viewer_html(paper_hash, _paper_content, height=800):
+    """
+    Build the embedded PDF viewer once per paper instead of on every rerun
+    
+    With static file serving enabled, arXiv papers are shown from a published
+    copy of the PDF, so each render ships a short URL rather than the whole
+    file. Uploads and URL imports may be private and static files are readable
+    by anyone with the link, so those (and everything when static serving is
+    off) are inlined as base64; cache_resource then returns that
+    (multi-megabyte) string by reference instead of unpickling it on each hit.
+    
+    Args:
+        paper_hash: Content hash of the paper
+        _paper_content: PaperContent object (excluded from hashing)
+        height: Height of the PDF viewer in pixels
+        
+    Returns:
+        HTML string for the PDF viewer or None if PDF is not available
+    """
+    pdf_url = None
+    if (paper_hash and _paper_content.pdf_bytes and
+            _paper_content.metadata.get("source") == "arxiv" and
+            st.get_option("server.enableStaticServing")):
+        pdf_url = publish_pdf(paper_hash, _paper_content.pdf_bytes)
+    
+    html = get_embedded_pdf_viewer(_paper_content, height=height, pdf_url=pdf_url)
+    
+    # Dedent so the HTML can follow a markdown heading without reading as a code block
+    return textwrap.dedent(html).strip() if html else None
+
+
+def enrich_metadata_with_ai(paper_content, api_key):
+    """
+    Fill in missing title/author/abstract from a quick summary of the paper
+    
+    The quick summary runs in one parallel batch together with terminology and
+    field-tag extraction, so callers can reuse those results instead of issuing
+    the same Gemini requests again afterwards.
+    
+    Returns:
+        Dictionary of batch results (empty if metadata was already complete)
+    """
+    title = paper_content.metadata.get('title', '')
+    author = paper_content.metadata.get('author', '')
+    abstract = paper_content.metadata.get('abstract', '')
+    
+    if not (title == "Unknown Title" or author == "Unknown Author" or 'abstract' not in paper_content.metadata):
+        return {}
+    
+    # Use first 3 pages so the batched terminology matches the standalone extraction
+    initial_results = process_paper_with_parallel_analysis(
+        paper_content.page_images[:3],
+        paper_content.metadata,
+        api_key,
+        paper_content.pdf_bytes,
+        analysis_types=["quick_summary"]  # Only run quick summary to extract basic info
+    )
+    
+    if "quick_summary" in initial_results and initial_results["quick_summary"].is_successful:
+        # Extract title and authors if they were not available
+        summary = initial_results["quick_summary"].raw_analysis
+        
+        # First line is often the title in summaries
+        if title == "Unknown Title" and summary:
+            lines = summary.split('\n')
+            if lines and len(lines[0]) > 5 and len(lines[0]) < 200:
+                paper_content.metadata["title"] = lines[0].strip()
+        
+        # Look for author mentions
+        if author == "Unknown Author" and "author" in summary.lower():
+            author_match = re.search(r'(?:by|author[s]?:?)\s+([^\.]+)', summary, re.IGNORECASE)
+            if author_match:
+                paper_content.metadata["author"] = author_match.group(1).strip()
+        
+        # Look for abstract-like content
+        if 'abstract' not in paper_content.metadata:
+            # Use the first paragraph as a pseudo-abstract
+            paragraphs = re.split(r'\n\s*\n', summary)
+            if len(paragraphs) > 1 and len(paragraphs[1]) > 30:
+                paper_content.metadata["abstract"] = paragraphs[1].strip()
+    
+    # Field tags computed from the pre-repair title/abstract are stale if either changed
+    if (paper_content.metadata.get('title', '') != title or
+            paper_content.metadata.get('abstract', '') != abstract):
+        initial_results.pop("field_tags", None)
+    
+    return initial_results
+
+
+def extract_field_tags_and_terminology(paper_content, api_key, initial_results=None):
+    """
+    Populate session terminology (and any ready field tags) for a freshly loaded paper
+    
+    Args:
+        paper_content: Loaded PaperContent
+        api_key: Optional API key
+        initial_results: Batch results from enrich_metadata_with_ai, reused
+            where available to avoid repeating Gemini requests
+    """
+    initial_results = initial_results or {}
+    
+    # Field tags are not needed to paint the analysis tab, so unless the repair
+    # batch already produced them they are fetched by run_parallel_analysis
+    if initial_results.get("field_tags"):
+        st.session_state.field_tags = initial_results["field_tags"]
+    
+    # Terminology is only needed once the analysis tab renders, so unless the
+    # repair batch already produced it, extract it in the background and let
+    # collect_background_terminology pick it up
+    if initial_results.get("terminology"):
+        st.session_state.analysis_results["terminology"] = initial_results["terminology"]
+        st.session_state.terminology_loaded = True
+    else:
+        st.session_state.terminology_future = start_background_terminology(paper_content, api_key)
+
+
+def start_background_terminology(paper_content, api_key):
+    """
+    Extract terminology on a background thread
+    
+    The thread gets this session's script run context attached, so the
+    st.cache_data-backed get_terminology behaves as it does on the script
+    thread. A fresh thread is used per paper rather than a pool, so a
+    context never lingers on a thread that later serves another session.
+    
+    Returns:
+        Future resolving to the terminology dictionary
+    """
+    future = concurrent.futures.Future()
+    
+    def worker():
+        try:
+            future.set_result(get_terminology(paper_content, api_key))
+        except Exception as e:
+            future.set_exception(e)
+    
+    thread = threading.Thread(target=worker, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+    
+    return future
+
+
+def collect_background_terminology():
+    """Move finished background terminology into the session results"""
+    future = st.session_state.terminology_future
+    if not future or not future.done():
+        return
+    
+    st.session_state.terminology_future = None
+    
+    try:
+        terminology = future.result()
+        if terminology:
+            st.session_state.analysis_results["terminology"] = terminology
+            st.session_state.terminology_loaded = True
+    except Exception as e:
+        print(f"Error extracting terminology: {str(e)}")
+
+
+@st.fragment(run_every=2)
+def poll_background_terminology():
+    """
+    Show a placeholder while terminology is extracted, rerunning the app once
+    it is ready
+    
+    Only rendered while a terminology future is pending, so the polling stops
+    as soon as the result has been collected.
+    """
+    future = st.session_state.terminology_future
+    if future and future.done():
+        # A full rerun lets show_analysis_interface collect and display the
+        # terms; this fragment isn't rendered again afterwards
+        st.rerun()
+    
+    st.caption("⏳ Extracting key terminology...")
+
+
 def process_paper_upload(uploaded_file):
     """Process uploaded PDF file"""
-    progress = ProgressManager(total_steps=5, key_prefix="upload")
+    progress = ProgressManager(total_steps=4, key_prefix="upload")
     progress.update("Uploading PDF...", step=1)
     
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            tmp.write(uploaded_file.read())
-            tmp_path = tmp.name
+        # Load straight from the upload buffer; PyMuPDF opens PDFs from memory,
+        # so there is no need for a temporary file
+        pdf_bytes = uploaded_file.getvalue()
+        
+        # Key the upload on its content so re-uploading the same paper hits the cache
+        file_hash = hashlib.sha1(pdf_bytes).hexdigest()
         
         progress.update("Loading and processing PDF...", step=2)
         
-        paper_content = load_pdf_from_path(tmp_path)
+        paper_content = load_paper(
+            f"upload_{file_hash}",
+            load_pdf_from_bytes,
+            pdf_bytes,
+            filename=uploaded_file.name
+        )
         if not paper_content.is_valid:
             progress.complete(False, f"Error loading PDF: {paper_content.error}")
             return None
@@ -320,73 +704,14 @@ def process_paper_upload(uploaded_file):
         progress.update("Enriching metadata with AI...", step=3)
         
         # Use LLM to extract metadata if not available
-        api_key = st.session_state.user_api_key if 'user_api_key' in st.session_state else None
+        api_key = st.session_state.user_api_key
         
         # Only run initial analysis if title/author/abstract are not well-defined
-        title = paper_content.metadata.get('title', '')
-        author = paper_content.metadata.get('author', '')
-        
-        if title == "Unknown Title" or author == "Unknown Author" or 'abstract' not in paper_content.metadata:
-            # Use first 2 pages for metadata extraction
-            initial_results = process_paper_with_parallel_analysis(
-                paper_content.page_images[:min(2, len(paper_content.page_images))],
-                paper_content.metadata,
-                api_key,
-                paper_content.pdf_bytes,
-                analysis_types=["quick_summary"]  # Only run quick summary to extract basic info
-            )
-            
-            if "quick_summary" in initial_results and initial_results["quick_summary"].is_successful:
-                # Extract title and authors if they were not available
-                summary = initial_results["quick_summary"].raw_analysis
-                
-                # First line is often the title in summaries
-                if title == "Unknown Title" and summary:
-                    lines = summary.split('\n')
-                    if lines and len(lines[0]) > 5 and len(lines[0]) < 200:
-                        paper_content.metadata["title"] = lines[0].strip()
-                
-                # Look for author mentions
-                if author == "Unknown Author" and "author" in summary.lower():
-                    author_match = re.search(r'(?:by|author[s]?:?)\s+([^\.]+)', summary, re.IGNORECASE)
-                    if author_match:
-                        paper_content.metadata["author"] = author_match.group(1).strip()
-                
-                # Look for abstract-like content
-                if 'abstract' not in paper_content.metadata:
-                    # Use the first paragraph as a pseudo-abstract
-                    paragraphs = re.split(r'\n\s*\n', summary)
-                    if len(paragraphs) > 1 and len(paragraphs[1]) > 30:
-                        paper_content.metadata["abstract"] = paragraphs[1].strip()
-        
-        progress.update("Extracting research fields...", step=4)
-        
-        # Extract field tags
-        title = paper_content.metadata.get('title', '')
-        abstract = paper_content.metadata.get('abstract', '')
-        
-        if len(title) > 5 and len(abstract) > 20:
-            st.session_state.field_tags = get_field_tags(
-                title, 
-                abstract,
-                api_key
-            )
+        initial_results = enrich_metadata_with_ai(paper_content, api_key)
         
-        progress.update("Extracting terminology...", step=5)
+        progress.update("Extracting research fields and terminology...", step=4)
         
-        # Extract terminology
-        try:
-            terminology = analyze_terminology(
-                paper_content.page_images[:min(3, len(paper_content.page_images))],
-                paper_content.metadata,
-                api_key
-            )
-            
-            if terminology:
-                st.session_state.analysis_results["terminology"] = terminology
-                st.session_state.terminology_loaded = True
-        except Exception as e:
-            print(f"Error extracting terminology: {str(e)}")
+        extract_field_tags_and_terminology(paper_content, api_key, initial_results)
         
         progress.complete(True, "Paper loaded successfully!")
         
@@ -398,13 +723,6 @@ def process_paper_upload(uploaded_file):
     except Exception as e:
         progress.complete(False, f"Error processing PDF: {str(e)}")
         return None
-    finally:
-        # Clean up the temporary file
-        try:
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-        except Exception as e:
-            print(f"Failed to clean up temporary file: {str(e)}")
 
 
 def process_arxiv_import(arxiv_id):
@@ -423,46 +741,22 @@ def process_arxiv_import(arxiv_id):
         
         # Validate arXiv ID format
         arxiv_id = arxiv_id.strip()
-        if not (arxiv_id.isdigit() or 
-                (arxiv_id.replace('.', '').isdigit()) or
-                ('.' in arxiv_id and arxiv_id.split('.')[0].isdigit() and arxiv_id.split('.')[1].isdigit())):
+        if not ARXIV_ID_PATTERN.match(arxiv_id):
             progress.complete(False, "Invalid arXiv ID format")
             return None
         
         progress.update("Fetching paper from arXiv...", step=2)
         
-        paper_content = load_pdf_from_arxiv(arxiv_id)
+        paper_content = load_paper(f"arxiv_{arxiv_id}", load_pdf_from_arxiv, arxiv_id)
         if not paper_content.is_valid:
             progress.complete(False, f"Error loading paper from arXiv: {paper_content.error}")
             return None
         
         progress.update("Processing paper metadata...", step=3)
         
-        # Extract field tags
-        title = paper_content.metadata.get('title', '')
-        abstract = paper_content.metadata.get('abstract', '')
-        api_key = st.session_state.user_api_key if 'user_api_key' in st.session_state else None
+        api_key = st.session_state.user_api_key
         
-        if len(title) > 5 and len(abstract) > 20:
-            st.session_state.field_tags = get_field_tags(
-                title, 
-                abstract,
-                api_key
-            )
-        
-        # Extract terminology
-        try:
-            terminology = analyze_terminology(
-                paper_content.page_images[:min(3, len(paper_content.page_images))],
-                paper_content.metadata,
-                api_key
-            )
-            
-            if terminology:
-                st.session_state.analysis_results["terminology"] = terminology
-                st.session_state.terminology_loaded = True
-        except Exception as e:
-            print(f"Error extracting terminology: {str(e)}")
+        extract_field_tags_and_terminology(paper_content, api_key)
         
         progress.complete(True, "Paper loaded successfully!")
         
@@ -493,15 +787,17 @@ def process_url_import(url):
         st.session_state.last_action = f"url_{url}"
         st.session_state.paper_processed = False
         
-        # Very basic URL validation
+        # Basic URL validation: an http(s) link whose path names a PDF
         url = url.strip()
-        if not (url.startswith('http://') or url.startswith('https://')) or '.pdf' not in url.lower():
+        parsed_url = urlparse(url)
+        if (parsed_url.scheme not in ('http', 'https') or not parsed_url.netloc or
+                not parsed_url.path.lower().endswith('.pdf')):
             progress.complete(False, "Invalid URL format. Please provide a direct link to a PDF file.")
             return None
         
         progress.update("Downloading PDF from URL...", step=2)
         
-        paper_content = load_pdf_from_url(url)
+        paper_content = load_paper(f"url_{url}", load_pdf_from_url, url)
         if not paper_content.is_valid:
             progress.complete(False, f"Error downloading PDF: {paper_content.error}")
             return None
@@ -509,71 +805,14 @@ def process_url_import(url):
         progress.update("Enriching metadata with AI...", step=3)
         
         # Use LLM to extract metadata if not available
-        api_key = st.session_state.user_api_key if 'user_api_key' in st.session_state else None
+        api_key = st.session_state.user_api_key
         
         # Only run initial analysis if title/author/abstract are not well-defined
-        title = paper_content.metadata.get('title', '')
-        author = paper_content.metadata.get('author', '')
-        
-        if title == "Unknown Title" or author == "Unknown Author" or 'abstract' not in paper_content.metadata:
-            # Use first 2 pages for metadata extraction
-            initial_results = process_paper_with_parallel_analysis(
-                paper_content.page_images[:min(2, len(paper_content.page_images))],
-                paper_content.metadata,
-                api_key,
-                paper_content.pdf_bytes,
-                analysis_types=["quick_summary"]  # Only run quick summary to extract basic info
-            )
-            
-            if "quick_summary" in initial_results and initial_results["quick_summary"].is_successful:
-                # Extract title and authors if they were not available
-                summary = initial_results["quick_summary"].raw_analysis
-                
-                # First line is often the title in summaries
-                if title == "Unknown Title" and summary:
-                    lines = summary.split('\n')
-                    if lines and len(lines[0]) > 5 and len(lines[0]) < 200:
-                        paper_content.metadata["title"] = lines[0].strip()
-                
-                # Look for author mentions
-                if author == "Unknown Author" and "author" in summary.lower():
-                    author_match = re.search(r'(?:by|author[s]?:?)\s+([^\.]+)', summary, re.IGNORECASE)
-                    if author_match:
-                        paper_content.metadata["author"] = author_match.group(1).strip()
-                
-                # Look for abstract-like content
-                if 'abstract' not in paper_content.metadata:
-                    # Use the first paragraph as a pseudo-abstract
-                    paragraphs = re.split(r'\n\s*\n', summary)
-                    if len(paragraphs) > 1 and len(paragraphs[1]) > 30:
-                        paper_content.metadata["abstract"] = paragraphs[1].strip()
+        initial_results = enrich_metadata_with_ai(paper_content, api_key)
         
         progress.update("Extracting research fields and terminology...", step=4)
         
-        # Extract field tags
-        title = paper_content.metadata.get('title', '')
-        abstract = paper_content.metadata.get('abstract', '')
-        
-        if len(title) > 5 and len(abstract) > 20:
-            st.session_state.field_tags = get_field_tags(
-                title, 
-                abstract,
-                api_key
-            )
-        
-        # Extract terminology
-        try:
-            terminology = analyze_terminology(
-                paper_content.page_images[:min(3, len(paper_content.page_images))],
-                paper_content.metadata,
-                api_key
-            )
-            
-            if terminology:
-                st.session_state.analysis_results["terminology"] = terminology
-                st.session_state.terminology_loaded = True
-        except Exception as e:
-            print(f"Error extracting terminology: {str(e)}")
+        extract_field_tags_and_terminology(paper_content, api_key, initial_results)
         
         progress.complete(True, "Paper loaded successfully!")
         
@@ -596,50 +835,86 @@ def run_parallel_analysis():
         return
     
     # Get API key
-    api_key = st.session_state.user_api_key if 'user_api_key' in st.session_state else None
+    api_key = st.session_state.user_api_key
+    
+    # Get available analysis types
+    analysis_types = ANALYSIS_TYPES
+    paper_hash = st.session_state.paper_content.content_hash
+    
+    # Reuse analyses persisted by earlier sessions and only run the rest
+    analysis_list = []
+    for analysis_type in analysis_types:
+        cached = get_cached_result(paper_hash, analysis_type)
+        if cached:
+            st.session_state.analysis_results[analysis_type] = cached
+        else:
+            analysis_list.append(analysis_type)
+    
+    # Only fetch utility results the import step didn't already provide (or
+    # isn't still extracting in the background)
+    include_terminology = not (st.session_state.terminology_loaded or st.session_state.terminology_future)
+    include_field_tags = not st.session_state.field_tags
+    
+    if not (analysis_list or include_terminology or include_field_tags):
+        st.session_state.analyses_running = False
+        return
+    
+    # Optionally send the paper once for all analyses instead of once per type
+    batch_analyses = UI_SETTINGS.get("batch_auto_analyses", False) and len(analysis_list) > 1
     
-    # Create a progress manager
-    progress = ProgressManager(total_steps=3, key_prefix="parallel_analysis")
-    progress.update("Starting parallel paper analysis...", step=1)
+    # Create a progress manager with one step per task
+    analysis_tasks = 1 if batch_analyses else len(analysis_list)
+    total_tasks = analysis_tasks + include_terminology + include_field_tags
+    progress = ProgressManager(total_steps=total_tasks, key_prefix="parallel_analysis")
+    progress.update("Starting parallel paper analysis...", step=0)
+    
+    def on_task_complete(task_name, completed, total):
+        """Advance progress as each analysis task actually finishes"""
+        progress.update(f"Finished {task_name.replace('_', ' ')} ({completed}/{total})", step=completed)
     
     try:
-        # Get available analysis types
-        analysis_types = get_analysis_types()
-        analysis_list = list(analysis_types.keys())
-        
         # Run analyses in parallel
-        progress.update("Running multiple analysis types...", step=2)
-        
         results = process_paper_with_parallel_analysis(
             st.session_state.paper_content.page_images,
             st.session_state.paper_content.metadata,
             api_key,
             st.session_state.paper_content.pdf_bytes,
-            analysis_types=analysis_list
+            analysis_types=analysis_list,
+            on_task_complete=on_task_complete,
+            include_terminology=include_terminology,
+            include_field_tags=include_field_tags,
+            batch_analyses=batch_analyses
         )
         
         # Store results in session state
         for analysis_type, result in results.items():
-            if analysis_type in ["field_tags", "terminology"]:
-                continue  # These were already processed separately
+            if analysis_type == "field_tags":
+                st.session_state.field_tags = result
+                continue
+            if analysis_type == "terminology":
+                if result:
+                    st.session_state.analysis_results["terminology"] = result
+                    st.session_state.terminology_loaded = True
+                continue
                 
             st.session_state.analysis_results[analysis_type] = result
-        
-        progress.update("Completing analysis...", step=3)
-        progress.complete(True, f"Completed {len(analysis_list)} analyses!")
+            cache_result(paper_hash, result)
         
         # Flag that analyses are complete
         st.session_state.analyses_running = False
         
-        # Request app rerun to display results
+        # Request app rerun to display results (the rerun replaces the progress
+        # display, so there is no point holding a completion message on screen)
+        progress.clear()
         st.rerun()
         
     except Exception as e:
         progress.complete(False, f"Error during parallel analysis: {str(e)}")
 
 
+@st.fragment
 def show_import_interface():
-    """Show paper import interface"""
+    """Show paper import interface (reruns on its own when its widgets change)"""
     st.markdown("## Import Paper")
     
     # Tab-based input method selection
@@ -660,6 +935,9 @@ def show_import_interface():
                 # Clear previous state
                 st.session_state.paper_content = None
                 st.session_state.analysis_results = {"terminology": {}}
+                st.session_state.field_tags = {}
+                st.session_state.terminology_loaded = False
+                st.session_state.terminology_future = None
                 
                 # Process the file
                 paper_content = process_paper_upload(uploaded_file)
@@ -684,6 +962,9 @@ def show_import_interface():
                 # Clear previous state
                 st.session_state.paper_content = None
                 st.session_state.analysis_results = {"terminology": {}}
+                st.session_state.field_tags = {}
+                st.session_state.terminology_loaded = False
+                st.session_state.terminology_future = None
                 
                 paper_content = process_arxiv_import(arxiv_id)
                 
@@ -708,6 +989,9 @@ def show_import_interface():
                 # Clear previous state
                 st.session_state.paper_content = None
                 st.session_state.analysis_results = {"terminology": {}}
+                st.session_state.field_tags = {}
+                st.session_state.terminology_loaded = False
+                st.session_state.terminology_future = None
                 
                 paper_content = process_url_import(pdf_url)
                 
@@ -723,14 +1007,34 @@ def show_import_interface():
                     st.rerun()
 
 
+def show_model_selection():
+    """Show the model selector in the sidebar once a paper is loaded"""
+    # Fragments can't write to the sidebar, so this lives outside
+    # show_analysis_interface
+    paper_content = st.session_state.paper_content
+    if not paper_content or not paper_content.is_valid:
+        return
+    
+    with st.sidebar:
+        st.markdown("### Model Selection")
+        
+        display_model_selector(MODELS, st.session_state.model_choice)
+
+
+@st.fragment
 def show_analysis_interface():
-    """Show paper analysis interface"""
+    """Show paper analysis interface (reruns on its own when its widgets change)"""
     paper_content = st.session_state.paper_content
     
     if not paper_content or not paper_content.is_valid:
         st.info("Please import a paper first using the Import Paper tab.")
         return
     
+    # Display paper metadata first so the header paints before the analysis
+    # batch (which also fetches field tags) starts; the rerun at the end of
+    # the batch fills in the tags
+    display_paper_metadata(paper_content)
+    
     # Check if we need to run parallel analysis
     if st.session_state.analyses_running:
         # Show a placeholder while analyses are running
@@ -738,12 +1042,12 @@ def show_analysis_interface():
             # Run the analyses
             run_parallel_analysis()
     
-    # Display paper metadata
-    display_paper_metadata(paper_content)
-    
     # Display terminology if available
+    collect_background_terminology()
     if "terminology" in st.session_state.analysis_results and st.session_state.analysis_results["terminology"]:
         display_terminology(st.session_state.analysis_results["terminology"])
+    elif st.session_state.terminology_future:
+        poll_background_terminology()
     
     # Create a two-column layout for controls and PDF viewer
     col1, col2 = st.columns([2, 3])
@@ -752,23 +1056,10 @@ def show_analysis_interface():
         st.markdown("### Choose Analysis Type")
         
         # Get available analysis types
-        analysis_types = get_analysis_types()
+        analysis_types = ANALYSIS_TYPES
         
         # Display analysis type selector
-        new_type = display_analysis_selector(analysis_types, st.session_state.current_analysis_type)
-        if new_type != st.session_state.current_analysis_type:
-            st.session_state.current_analysis_type = new_type
-            st.rerun()
-        
-        # Display model selector in sidebar instead
-        with st.sidebar:
-            st.markdown("### Model Selection")
-            
-            models = get_models()
-            new_model = display_model_selector(models, st.session_state.model_choice)
-            if new_model != st.session_state.model_choice:
-                st.session_state.model_choice = new_model
-                st.rerun()
+        display_analysis_selector(analysis_types, st.session_state.current_analysis_type)
         
         # Analyze button - only needed if the analysis doesn't exist yet
         current_type = st.session_state.current_analysis_type
@@ -783,33 +1074,39 @@ def show_analysis_interface():
             # Run analysis if button clicked
             if analyze_button:
                 with st.spinner(f"Performing {current_type} analysis..."):
-                    api_key = st.session_state.user_api_key
-                    result = analyze_paper(
-                        paper_content.page_images,
-                        paper_content.metadata,
-                        current_type,
-                        api_key,
-                        pdf_bytes=paper_content.pdf_bytes
-                    )
+                    result = get_cached_result(paper_content.content_hash, current_type)
+                    if not result:
+                        # Stream partial output so reading can start before generation ends
+                        stream_placeholder = st.empty()
+                        api_key = st.session_state.user_api_key
+                        result = analyze_paper(
+                            paper_content.page_images,
+                            paper_content.metadata,
+                            current_type,
+                            api_key,
+                            pdf_bytes=paper_content.pdf_bytes,
+                            on_chunk=stream_placeholder.markdown
+                        )
+                        cache_result(paper_content.content_hash, result)
                     st.session_state.analysis_results[current_type] = result
                     st.rerun()
     
     with col2:
-        # Display PDF viewer
-        st.markdown("### Paper Preview")
-        
         # Get PDF viewer HTML
-        pdf_viewer_html = get_embedded_pdf_viewer(paper_content, height=600)
+        pdf_viewer_html = get_pdf_viewer_html(paper_content.content_hash, paper_content, height=600)
         
+        # Display PDF viewer (sent together with its heading as one element)
         if pdf_viewer_html:
-            st.markdown(pdf_viewer_html, unsafe_allow_html=True)
+            st.markdown(f"### Paper Preview\n{pdf_viewer_html}", unsafe_allow_html=True)
         else:
+            st.markdown("### Paper Preview")
+            
             # Fallback to showing first page image
-            if paper_content.page_images:
+            if paper_content.preview_bytes:
                 st.image(
-                    paper_content.page_images[0],
+                    paper_content.preview_bytes,
                     caption="First page preview (PDF viewer not available)",
-                    use_column_width=True
+                    width=UI_SETTINGS["preview_width"]
                 )
     
     # Display analysis results if available
@@ -840,27 +1137,24 @@ def show_analysis_interface():
                 st.download_button(
                     label="📥 Download as Markdown",
                     data=result.raw_analysis,
-                    file_name=f"paperbuddy_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                    file_name=f"{result.file_stem}.md",
                     mime="text/markdown",
                     use_container_width=True
                 )
                 
                 # Download as JSON
-                import json
-                json_data = {
-                    "title": paper_content.metadata.get("title", "Unknown"),
-                    "authors": paper_content.metadata.get("author", "Unknown"),
-                    "analysis_type": result.analysis_type,
-                    "model_used": result.model_used,
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "sections": result.sections,
-                    "raw_analysis": result.raw_analysis
-                }
-                
                 st.download_button(
                     label="📥 Download as JSON",
-                    data=json.dumps(json_data, indent=2),
-                    file_name=f"paperbuddy_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    data=prepare_json_download(
+                        paper_content.metadata.get("title", "Unknown"),
+                        paper_content.metadata.get("author", "Unknown"),
+                        result.analysis_type,
+                        result.model_used,
+                        result.created_at,
+                        result.sections,
+                        result.raw_analysis
+                    ),
+                    file_name=f"{result.file_stem}.json",
                     mime="application/json",
                     use_container_width=True
                 )
@@ -902,8 +1196,7 @@ def configure_sidebar():
     # Add option to reset
     if st.sidebar.button("Reset Session", use_container_width=True):
         # Clear all session state
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        st.session_state.clear()
         st.rerun()
 
 
@@ -929,6 +1222,7 @@ def main():
         if st.session_state.tab_index == 0:
             show_import_interface()
         elif st.session_state.tab_index == 1:
+            show_model_selection()
             show_analysis_interface()
         elif st.session_state.tab_index == 2:
             show_library_interface()
@@ -1,5 +1,8 @@
 import os
-from typing import Dict, Any, Optional, List
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Optional, Mapping, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,29 +16,54 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 # API configuration
 API_KEY = os.getenv("GOOGLE_API_KEY")
 
-# Model definitions
-MODEL_DEFINITIONS = {
+# Client-side rate limiting for Gemini requests (one bucket per API key)
+RATE_LIMIT_SETTINGS = {
+    "requests_per_second": 2,
+    "burst": 4,
+    "max_retries": 4,
+    "initial_backoff": 1.0  # Seconds, doubled after each retry
+}
+
+# Page images sent to Gemini (the vision encoder tiles inputs well below
+# render resolution, so larger images only cost upload time)
+VISION_IMAGE_SETTINGS = {
+    "max_dimension": 1024,
+    "jpeg_quality": 80
+}
+
+# Directory for analysis results persisted across sessions
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", ".paperbuddy_cache")
+RESULT_CACHE_TTL = 30 * 24 * 60 * 60  # Seconds before a cached analysis is re-run
+
+# Model definitions (read-only; see MODEL_CONFIGS for merged settings).
+# output_token_limit is the model's maximum response length; utility models
+# without one fall back to 8192
+MODEL_DEFINITIONS = MappingProxyType({
     # Main analysis models
     "default": {
         "name": "Default Quality",
         "model": os.getenv("DEFAULT_MODEL", "gemini-2.5-flash-preview-04-17"),
-        "description": "Good balance of quality and speed"
+        "description": "Good balance of quality and speed",
+        "output_token_limit": 65536
     },
     "pro": {
         "name": "Pro Quality",
         "model": os.getenv("PRO_MODEL", "gemini-2.5-flash-preview-04-17"),
         "description": "Highest quality analysis (requires API key)",
+        "output_token_limit": 65536,
         "requires_api_key": True
     },
     "alternate": {
         "name": "Balanced",
         "model": os.getenv("ALTERNATE_MODEL", "gemini-2.0-flash"),
-        "description": "Reliable fallback option"
+        "description": "Reliable fallback option",
+        "output_token_limit": 8192
     },
     "fallback": {
         "name": "Fast",
         "model": os.getenv("FALLBACK_MODEL", "gemini-1.5-flash"),
-        "description": "Fastest analysis with basic quality"
+        "description": "Fastest analysis with basic quality",
+        "output_token_limit": 8192
     },
     
     # Utility models for specific tasks
@@ -60,10 +88,10 @@ MODEL_DEFINITIONS = {
         "temperature": 0.1,
         "max_output_tokens": 1024
     }
-}
+})
 
-# Analysis configurations
-ANALYSIS_TYPES = {
+# Analysis configurations (read-only)
+ANALYSIS_TYPES = MappingProxyType({
     "comprehensive": {
         "title": "Comprehensive Analysis",
         "description": "Complete academic review with summary, innovations, techniques, and limitations",
@@ -153,115 +181,25 @@ ANALYSIS_TYPES = {
         "max_output_tokens": 1024,
         "auto_analyze": True
     }
-}
+})
+
+# Stylesheet injected into every page, see get_custom_css
+CUSTOM_CSS_PATH = Path(__file__).parent / "assets" / "custom.css"
 
 # Application UI settings
 UI_SETTINGS = {
     "pdf_viewer_height": 800,
+    "preview_width": 760,
     "show_debug_info": False,
     "default_analysis_type": "comprehensive",
     "default_model": "default",
     "auto_extract_definitions": True,
     "auto_switch_to_analysis": True,  # Auto-switch to analysis tab after loading paper
     "auto_run_analysis": True,        # Auto-run analysis after loading paper
+    "batch_auto_analyses": False,     # Request all auto-run analyses in one Gemini call
     "progress_timeout": 120
 }
 
-# Custom CSS for application
-CUSTOM_CSS = """
-<style>
-    /* Clean divider */
-    .divider {
-        height: 1px;
-        background-color: rgba(49, 51, 63, 0.2);
-        margin: 1rem 0;
-    }
-    
-    /* Field tag styling */
-    .field-tag {
-        display: inline-block;
-        background-color: rgba(28, 131, 225, 0.1);
-        padding: 0.2rem 0.6rem;
-        border-radius: 1rem;
-        margin-right: 0.5rem;
-        margin-bottom: 0.5rem;
-        font-size: 0.8rem;
-    }
-    
-    /* Improved button contrast */
-    div[data-testid="stButton"] > button {
-        font-weight: 600;
-    }
-    
-    /* Override for expander styling */
-    .streamlit-expanderHeader {
-        font-weight: 600;
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Remove extra padding around headers */
-    h1, h2, h3, h4, h5, h6 {
-        margin-top: 0.5rem !important;
-    }
-    
-    /* Add space after analysis results */
-    .stMarkdown {
-        padding-bottom: 0.5rem;
-    }
-    
-    /* Make container border more subtle */
-    [data-testid="stDecoration"] {
-        opacity: 0.2;
-    }
-    
-    /* PDF viewer container */
-    .pdf-viewer-container {
-        border: 1px solid rgba(49, 51, 63, 0.2);
-        border-radius: 0.5rem;
-        padding: 0.5rem;
-        margin: 1rem 0;
-    }
-    
-    /* Definition cards */
-    .definition-card {
-        border: 1px solid rgba(49, 51, 63, 0.2);
-        border-radius: 0.5rem;
-        padding: 1rem;
-        margin-bottom: 1rem;
-        background-color: rgba(255, 255, 255, 0.03);
-    }
-    
-    /* Tab content padding */
-    .stTabs [data-baseweb="tab-panel"] {
-        padding-top: 1rem;
-    }
-    
-    /* Analysis result ratings */
-    .rating {
-        display: inline-block;
-        padding: 0.2rem 0.5rem;
-        border-radius: 0.25rem;
-        font-weight: bold;
-        margin-right: 0.5rem;
-    }
-    
-    .rating-low {
-        background-color: rgba(255, 99, 71, 0.2);
-        color: #ff6347;
-    }
-    
-    .rating-medium {
-        background-color: rgba(255, 165, 0, 0.2);
-        color: #ffa500;
-    }
-    
-    .rating-high {
-        background-color: rgba(34, 139, 34, 0.2);
-        color: #228b22;
-    }
-</style>
-"""
-
 def get_api_key(user_api_key: Optional[str] = None) -> str:
     """
     Get API key, prioritizing user-provided key
@@ -275,7 +213,32 @@ def get_api_key(user_api_key: Optional[str] = None) -> str:
     return user_api_key or API_KEY
 
 
-def get_model_config(analysis_type: str, model_override: Optional[str] = None) -> Dict[str, Any]:
+def _merge_model_config(analysis_type: str, model_override: Optional[str] = None) -> Mapping[str, Any]:
+    """Combine an analysis type's settings with its model definition"""
+    # Get analysis type configuration
+    analysis_config = ANALYSIS_TYPES.get(analysis_type, ANALYSIS_TYPES.get("comprehensive", {}))
+    
+    # Get specified model (from override, analysis config, or default)
+    model_type = model_override or analysis_config.get("model", "default")
+    model_config = MODEL_DEFINITIONS.get(model_type, MODEL_DEFINITIONS.get("default", {}))
+    
+    # Create combined configuration with model info taking precedence
+    return MappingProxyType({**analysis_config, **model_config})
+
+
+@lru_cache(maxsize=1)
+def get_custom_css() -> str:
+    """
+    Get the custom CSS for the application
+    
+    Returns:
+        Contents of assets/custom.css wrapped in a <style> tag, read on first call
+    """
+    css = CUSTOM_CSS_PATH.read_text(encoding="utf-8")
+    return f"<style>\n{css}</style>"
+
+
+def get_model_config(analysis_type: str, model_override: Optional[str] = None) -> Mapping[str, Any]:
     """
     Get configuration for specific analysis type and model
     
@@ -284,52 +247,58 @@ def get_model_config(analysis_type: str, model_override: Optional[str] = None) -
         model_override: Optional model override
         
     Returns:
-        Configuration dictionary
+        Read-only configuration mapping
     """
-    # Get analysis type configuration
-    analysis_config = ANALYSIS_TYPES.get(analysis_type, ANALYSIS_TYPES.get("comprehensive", {}))
-    
-    # Get specified model (from override, analysis config, or default)
-    model_type = model_override or analysis_config.get("model", "default")
-    model_config = MODEL_DEFINITIONS.get(model_type, MODEL_DEFINITIONS.get("default", {}))
-    
-    # Create combined configuration with model info taking precedence
-    config = {**analysis_config, **model_config}
+    config = MODEL_CONFIGS.get((analysis_type, model_override))
+    if config is None:
+        config = _merge_model_config(analysis_type, model_override)
     
     return config
 
 
-def get_analysis_types() -> Dict[str, Dict[str, Any]]:
+# Merged configuration for every (analysis type, model override) pair, built
+# once at import. The mappings are read-only since every caller shares them.
+MODEL_CONFIGS = {
+    (analysis_type, model_type): _merge_model_config(analysis_type, model_type)
+    for analysis_type in ANALYSIS_TYPES
+    for model_type in [None, *MODEL_DEFINITIONS]
+}
+
+
+@lru_cache(maxsize=1)
+def get_analysis_types() -> Mapping[str, Mapping[str, Any]]:
     """
     Get displayable analysis types (excluding utility types)
     
     Returns:
-        Dictionary of analysis types
+        Read-only mapping of analysis types, built on first call
     """
-    return {k: v for k, v in ANALYSIS_TYPES.items() 
-            if k not in ["field_tags", "terminology", "metadata"]}
+    return MappingProxyType({k: v for k, v in ANALYSIS_TYPES.items() 
+                             if k not in ["field_tags", "terminology", "metadata"]})
 
 
-def get_models() -> Dict[str, Dict[str, Any]]:
+@lru_cache(maxsize=1)
+def get_models() -> Mapping[str, Mapping[str, Any]]:
     """
     Get displayable models
     
     Returns:
-        Dictionary of models
+        Read-only mapping of models, built on first call
     """
-    return {k: v for k, v in MODEL_DEFINITIONS.items() 
-            if k in ["default", "pro", "alternate", "fallback"]}
+    return MappingProxyType({k: v for k, v in MODEL_DEFINITIONS.items() 
+                             if k in ["default", "pro", "alternate", "fallback"]})
 
 
-def get_auto_analysis_types() -> List[str]:
+@lru_cache(maxsize=1)
+def get_auto_analysis_types() -> Tuple[str, ...]:
     """
     Get analysis types that should run automatically on paper load
     
     Returns:
-        List of analysis type keys to auto-run
+        Tuple of analysis type keys to auto-run, built on first call
     """
     if not UI_SETTINGS.get("auto_run_analysis", True):
-        return []
+        return ()
         
-    return [k for k, v in ANALYSIS_TYPES.items() 
-            if v.get("auto_analyze", False)]
\ No newline at end of file
+    return tuple(k for k, v in ANALYSIS_TYPES.items() 
+                 if v.get("auto_analyze", False))
@@ -3,23 +3,45 @@ import re
 import json
 import logging
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Union, Tuple
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Union, Tuple, Callable
 from PIL import Image
 import io
 import concurrent.futures
+import threading
+import weakref
+from functools import lru_cache
 
 from google import genai
 from google.genai import types
+from google.genai import errors
 
 # Config imports
-from config import get_model_config, get_api_key
-from utils.prompts import get_prompt
+from config import get_model_config, get_api_key, RATE_LIMIT_SETTINGS, VISION_IMAGE_SETTINGS
+from utils.prompts import get_prompt, get_multi_prompt
+from utils.rate_limit import TokenBucket
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# HTTP status codes worth retrying (rate limited / temporarily unavailable)
+RETRYABLE_STATUS_CODES = {429, 503}
+
+# Section body cleanup patterns used by extract_section
+BULLET_ONLY_LINE_PATTERN = re.compile(r'^\s*[\*\-\•]\s*$', re.MULTILINE)
+BULLET_PATTERN = re.compile(r'^\s*[\*\-\•]\s*', re.MULTILINE)
+EXTRA_NEWLINES_PATTERN = re.compile(r'\n{3,}')
+
+# Fenced JSON blocks in model responses, used by extract_structured_data
+JSON_BLOCK_PATTERN = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+
+# Encoded content parts for page images, see image_to_part
+_image_parts: Dict[int, types.Part] = {}
+_image_parts_lock = threading.Lock()
+
+
 @dataclass
 class AnalysisResult:
     """Data class for storing analysis results"""
@@ -31,6 +53,12 @@ class AnalysisResult:
     key_definitions: Dict[str, Dict[str, str]] = field(default_factory=dict)
     metadata: Dict[str, Any] = field(default_factory=dict)
     error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    file_stem: str = field(init=False)
+    
+    def __post_init__(self):
+        """Derive the download file name once, from the analysis time"""
+        self.file_stem = f"paperbuddy_analysis_{self.created_at:%Y%m%d_%H%M%S}"
     
     @property
     def is_successful(self) -> bool:
@@ -42,9 +70,18 @@ class AnalysisResult:
         return self.sections.get(section_name, default)
 
 
+@lru_cache(maxsize=8)
+def _get_cached_client(key: str) -> genai.Client:
+    """Create one client per API key so its HTTP connection pool is reused"""
+    return genai.Client(api_key=key)
+
+
 def create_genai_client(api_key: Optional[str] = None) -> genai.Client:
     """
-    Create Google Generative AI client with appropriate API key
+    Get Google Generative AI client with appropriate API key
+    
+    Clients are cached per key, so repeated calls share keep-alive
+    connections instead of paying a new TCP/TLS handshake each time.
     
     Args:
         api_key: Optional user-provided API key
@@ -58,7 +95,130 @@ def create_genai_client(api_key: Optional[str] = None) -> genai.Client:
     if not key:
         raise ValueError("No API key available. Please provide a valid API key.")
         
-    return genai.Client(api_key=key)
+    return _get_cached_client(key)
+
+
+@lru_cache(maxsize=64)
+def get_request_bucket(key: str) -> TokenBucket:
+    """
+    Get the rate limiter for an API key
+    
+    Quotas are per key, so each key gets its own bucket shared by every
+    thread and session using it; one user's burst doesn't throttle others.
+    
+    Args:
+        key: Resolved API key
+        
+    Returns:
+        Token bucket for requests made with this key
+    """
+    return TokenBucket(
+        rate=RATE_LIMIT_SETTINGS["requests_per_second"],
+        capacity=RATE_LIMIT_SETTINGS["burst"]
+    )
+
+
+@dataclass
+class StreamedResponse:
+    """Accumulated text of a streamed generation (mirrors response.text)"""
+    text: str
+
+
+def generate_content(
+    client: genai.Client,
+    api_key: Optional[str] = None,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    **kwargs
+) -> Union[types.GenerateContentResponse, StreamedResponse]:
+    """
+    Call generate_content under the key's rate limit, retrying quota errors
+    
+    Waits for a token from the API key's bucket before each attempt and backs off exponentially when
+    the API answers 429/503, so bursts of parallel requests degrade into
+    short waits instead of failed analyses.
+    
+    Args:
+        client: Gemini client
+        api_key: Optional user-provided API key the client was created with
+        on_chunk: Optional callback; when given the response is streamed and
+            the callback receives the accumulated text after each chunk
+        **kwargs: Arguments for client.models.generate_content
+        
+    Returns:
+        Model response
+    """
+    max_retries = RATE_LIMIT_SETTINGS["max_retries"]
+    delay = RATE_LIMIT_SETTINGS["initial_backoff"]
+    bucket = get_request_bucket(api_key or get_api_key())
+    
+    for attempt in range(max_retries + 1):
+        bucket.acquire()
+        try:
+            if not on_chunk:
+                return client.models.generate_content(**kwargs)
+            
+            text = ""
+            for chunk in client.models.generate_content_stream(**kwargs):
+                if chunk.text:
+                    text += chunk.text
+                    on_chunk(text)
+            return StreamedResponse(text=text)
+        except errors.APIError as e:
+            if e.code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                raise
+            logger.warning(f"Gemini returned {e.code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            delay *= 2
+
+
+def image_to_part(img: Image.Image) -> types.Part:
+    """
+    Encode a page image as a downscaled JPEG content part
+    
+    Pages are shrunk to VISION_IMAGE_SETTINGS["max_dimension"] and sent as
+    JPEG, which keeps text legible at a fraction of the PNG upload size.
+    Parts are memoized per image object, so the same page sent by the
+    terminology, summary and analysis requests is only encoded once.
+    
+    Args:
+        img: Page image
+        
+    Returns:
+        Content part containing the JPEG bytes
+    """
+    with _image_parts_lock:
+        part = _image_parts.get(id(img))
+    if part is not None:
+        return part
+    
+    # Encode outside the lock so different pages encode in parallel; two
+    # threads occasionally encoding the same page is cheaper than serializing
+    max_dimension = VISION_IMAGE_SETTINGS["max_dimension"]
+    
+    # Work on a copy; the original page image is still used for display
+    scaled = img.convert("RGB") if img.mode != "RGB" else img.copy()
+    scaled.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    
+    img_byte_arr = io.BytesIO()
+    scaled.save(img_byte_arr, format='JPEG', quality=VISION_IMAGE_SETTINGS["jpeg_quality"])
+    
+    part = types.Part.from_bytes(
+        data=img_byte_arr.getvalue(),
+        mime_type="image/jpeg"
+    )
+    
+    with _image_parts_lock:
+        # Keep whichever encode landed first so every caller shares one part
+        cached = _image_parts.get(id(img))
+        if cached is not None:
+            return cached
+        
+        # PIL images aren't hashable, so key on id() and drop the entry
+        # when the image is garbage collected (before its id can be reused)
+        _image_parts[id(img)] = part
+        weakref.finalize(img, _image_parts.pop, id(img), None)
+    
+    return part
 
 
 def extract_structured_data(response_text: str) -> Dict[str, Any]:
@@ -72,26 +232,16 @@ def extract_structured_data(response_text: str) -> Dict[str, Any]:
         Extracted structured data or empty dict
     """
     # Strategy 1: Look for JSON blocks (```json ... ```)
-    json_blocks = re.findall(r'```(?:json)?\s*([\s\S]*?)\s*```', response_text)
-    
-    for block in json_blocks:
+    for match in JSON_BLOCK_PATTERN.finditer(response_text):
         try:
-            result = json.loads(block.strip())
+            result = json.loads(match.group(1))
             if result and isinstance(result, dict):
                 return result
-        except:
+        except ValueError:
             pass
     
-    # Strategy 2: Look for entire response as JSON
-    if response_text.strip().startswith('{') and response_text.strip().endswith('}'):
-        try:
-            result = json.loads(response_text.strip())
-            if result and isinstance(result, dict):
-                return result
-        except:
-            pass
-    
-    # Strategy 3: Look for JSON-like objects anywhere in the text
+    # Strategy 2: Parse the outermost {...} span. When the whole response is
+    # a JSON object this is the entire response, so it is only parsed once
     bracket_start = response_text.find('{')
     bracket_end = response_text.rfind('}')
     
@@ -101,13 +251,32 @@ def extract_structured_data(response_text: str) -> Dict[str, Any]:
             result = json.loads(json_candidate)
             if result and isinstance(result, dict):
                 return result
-        except:
+        except ValueError:
             pass
     
     # If all strategies fail, return empty dict
     return {}
 
 
+@lru_cache(maxsize=32)
+def get_heading_patterns(section_name: str) -> Tuple[re.Pattern, ...]:
+    """
+    Compile the heading patterns for a section name once
+    
+    Args:
+        section_name: Name of the section heading
+        
+    Returns:
+        Compiled patterns for plain, markdown and numbered headings
+    """
+    name = re.escape(section_name)
+    return (
+        re.compile(fr'(?:^|\n)[ ]*{name}[ ]*(?:$|\n)', re.MULTILINE),  # Plain heading
+        re.compile(fr'(?:^|\n)[ ]*#{{1,6}}[ ]*{name}[ ]*(?:$|\n)', re.MULTILINE),  # Markdown heading
+        re.compile(fr'(?:^|\n)[ ]*\d+\.[ ]*{name}[ ]*(?:$|\n)', re.MULTILINE)  # Numbered heading
+    )
+
+
 def extract_section(text: str, section_name: str, next_section: Optional[str] = None) -> str:
     """
     Extract content of a specific section from analysis text
@@ -120,17 +289,10 @@ def extract_section(text: str, section_name: str, next_section: Optional[str] =
     Returns:
         Extracted section text or empty string
     """
-    # Different heading patterns to try
-    heading_patterns = [
-        fr'(?:^|\n)[ ]*{re.escape(section_name)}[ ]*(?:$|\n)',  # Plain heading
-        fr'(?:^|\n)[ ]*#{1,6}[ ]*{re.escape(section_name)}[ ]*(?:$|\n)',  # Markdown heading
-        fr'(?:^|\n)[ ]*\d+\.[ ]*{re.escape(section_name)}[ ]*(?:$|\n)'  # Numbered heading
-    ]
-    
-    # Try each pattern until one works
+    # Try each heading pattern until one works
     section_start = -1
-    for pattern in heading_patterns:
-        match = re.search(pattern, text, re.MULTILINE)
+    for pattern in get_heading_patterns(section_name):
+        match = pattern.search(text)
         if match:
             section_start = match.end()
             break
@@ -141,20 +303,19 @@ def extract_section(text: str, section_name: str, next_section: Optional[str] =
     # Find end of section
     section_end = len(text)
     if next_section:
-        for pattern in heading_patterns:
-            next_pattern = pattern.replace(re.escape(section_name), re.escape(next_section))
-            match = re.search(next_pattern, text[section_start:], re.MULTILINE)
+        for pattern in get_heading_patterns(next_section):
+            match = pattern.search(text, section_start)
             if match:
-                section_end = section_start + match.start()
+                section_end = match.start()
                 break
     
     # Extract and clean section text
     section_text = text[section_start:section_end].strip()
     
     # Clean up formatting issues
-    section_text = re.sub(r'^\s*[\*\-\•]\s*$', '', section_text, flags=re.MULTILINE)  # Remove bullet-only lines
-    section_text = re.sub(r'^\s*[\*\-\•]\s*', '* ', section_text, flags=re.MULTILINE)  # Standardize bullets
-    section_text = re.sub(r'\n{3,}', '\n\n', section_text)  # Fix extra newlines
+    section_text = BULLET_ONLY_LINE_PATTERN.sub('', section_text)  # Remove bullet-only lines
+    section_text = BULLET_PATTERN.sub('* ', section_text)  # Standardize bullets
+    section_text = EXTRA_NEWLINES_PATTERN.sub('\n\n', section_text)  # Fix extra newlines
     
     return section_text.strip()
 
@@ -293,16 +454,7 @@ def analyze_terminology(
         
         # Add page images
         for img in page_images[:max_pages]:
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            img_bytes = img_byte_arr.getvalue()
-            
-            contents.append(
-                types.Part.from_bytes(
-                    data=img_bytes,
-                    mime_type="image/png"
-                )
-            )
+            contents.append(image_to_part(img))
         
         # Set up generation parameters (using lower temperature for more reliable extraction)
         generation_config = types.GenerateContentConfig(
@@ -313,7 +465,9 @@ def analyze_terminology(
         )
         
         # Generate content
-        response = client.models.generate_content(
+        response = generate_content(
+            client,
+            api_key=api_key,
             model=config.get("model"),
             contents=contents,
             config=generation_config
@@ -368,7 +522,9 @@ def get_field_tags(
             top_k=40
         )
         
-        response = client.models.generate_content(
+        response = generate_content(
+            client,
+            api_key=api_key,
             model=config.get("model"),
             contents=prompt,
             config=generation_config
@@ -384,13 +540,61 @@ def get_field_tags(
         return {}
 
 
+def select_pages(
+    page_images: List[Image.Image],
+    max_pages: int,
+    figure_pages: Optional[List[int]] = None
+) -> List[Image.Image]:
+    """
+    Choose which page images to send to the model
+    
+    Short papers are sent whole. For longer papers, the opening pages
+    (abstract, introduction, method overview) fill half the budget and the
+    final pages (conclusion, references) are always kept. Pages carrying
+    raster figures come next, and whatever budget is left goes to evenly
+    spaced pages from the rest of the paper, so vector-only figures and
+    results sections are still sampled.
+    
+    Args:
+        page_images: List of page images
+        max_pages: Maximum number of pages to send
+        figure_pages: Zero-based indices of pages containing figures
+        
+    Returns:
+        min(max_pages, len(page_images)) selected page images in document order
+    """
+    page_count = len(page_images)
+    if page_count <= max_pages:
+        return page_images
+    
+    lead_pages = max(1, max_pages // 2)
+    tail_pages = min(2, max_pages - lead_pages)
+    selected = set(range(lead_pages)) | set(range(page_count - tail_pages, page_count))
+    
+    for page_num in figure_pages or []:
+        if len(selected) >= max_pages:
+            break
+        if 0 <= page_num < page_count:
+            selected.add(page_num)
+    
+    # Spread the remaining budget evenly over the pages not yet chosen
+    remaining = [i for i in range(page_count) if i not in selected]
+    needed = max_pages - len(selected)
+    if needed > 0:
+        step = len(remaining) / needed
+        selected.update(remaining[int((k + 0.5) * step)] for k in range(needed))
+    
+    return [page_images[i] for i in sorted(selected)]
+
+
 def analyze_paper(
     page_images: List[Image.Image],
     metadata: Dict[str, Any],
     analysis_type: str = "comprehensive",
     api_key: Optional[str] = None,
     pdf_bytes: Optional[bytes] = None,
-    simplified: bool = False
+    simplified: bool = False,
+    on_chunk: Optional[Callable[[str], None]] = None
 ) -> AnalysisResult:
     """
     Analyze paper using Gemini model
@@ -402,6 +606,8 @@ def analyze_paper(
         api_key: Optional API key
         pdf_bytes: Optional PDF bytes for direct PDF processing
         simplified: Whether to provide simplified explanation
+        on_chunk: Optional callback to stream partial output; receives the
+            accumulated analysis text as it is generated
         
     Returns:
         AnalysisResult object
@@ -445,7 +651,10 @@ def analyze_paper(
                     top_k=config.get("top_k", 40)
                 )
                 
-                response = client.models.generate_content(
+                response = generate_content(
+                    client,
+                    api_key=api_key,
+                    on_chunk=on_chunk,
                     model=config.get("model"),
                     contents=contents,
                     config=generation_config
@@ -465,22 +674,16 @@ def analyze_paper(
         
         # If we don't have a response yet, use image-based approach
         if not locals().get('response'):
-            # Select number of pages based on model capability and paper length
-            max_pages = min(config.get("max_pages", 15), len(page_images))
-            selected_images = page_images[:max_pages]
+            # Select pages based on model capability and paper length
+            selected_images = select_pages(
+                page_images,
+                config.get("max_pages", 15),
+                metadata.get("figure_pages", [])
+            )
             
             # Add each image
             for img in selected_images:
-                img_byte_arr = io.BytesIO()
-                img.save(img_byte_arr, format='PNG')
-                img_bytes = img_byte_arr.getvalue()
-                
-                contents.append(
-                    types.Part.from_bytes(
-                        data=img_bytes,
-                        mime_type="image/png"
-                    )
-                )
+                contents.append(image_to_part(img))
             
             # Generate content using images
             generation_config = types.GenerateContentConfig(
@@ -490,7 +693,10 @@ def analyze_paper(
                 top_k=config.get("top_k", 40)
             )
             
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
+                api_key=api_key,
+                on_chunk=on_chunk,
                 model=config.get("model"),
                 contents=contents,
                 config=generation_config
@@ -539,12 +745,141 @@ def analyze_paper(
         )
 
 
+def analyze_paper_multi(
+    page_images: List[Image.Image],
+    metadata: Dict[str, Any],
+    analysis_types: List[str],
+    api_key: Optional[str] = None,
+    pdf_bytes: Optional[bytes] = None
+) -> Dict[str, AnalysisResult]:
+    """
+    Run several analysis types in a single Gemini request
+    
+    The paper is uploaded once and the model returns one JSON object with a
+    field per analysis type, so N analyses cost one upload and one request.
+    
+    Args:
+        page_images: List of page images
+        metadata: Paper metadata
+        analysis_types: Types of analysis to perform
+        api_key: Optional API key
+        pdf_bytes: Optional PDF bytes for direct PDF processing
+        
+    Returns:
+        Dictionary mapping analysis type to AnalysisResult
+    """
+    start_time = time.time()
+    configs = {analysis_type: get_model_config(analysis_type) for analysis_type in analysis_types}
+    config = configs[analysis_types[0]]
+    model_name = config.get("model")
+    
+    try:
+        client = create_genai_client(api_key)
+        prompt = get_multi_prompt(analysis_types, metadata)
+        
+        # One string field per analysis type. The combined budget is capped at
+        # the model's output limit, which the sum of per-type budgets exceeds
+        generation_config = types.GenerateContentConfig(
+            max_output_tokens=min(
+                sum(c.get("max_output_tokens", 8192) for c in configs.values()),
+                config.get("output_token_limit", 8192)
+            ),
+            temperature=config.get("temperature", 0.2),
+            top_p=config.get("top_p", 0.95),
+            top_k=config.get("top_k", 40),
+            response_mime_type="application/json",
+            response_schema=types.Schema(
+                type=types.Type.OBJECT,
+                properties={
+                    analysis_type: types.Schema(type=types.Type.STRING)
+                    for analysis_type in analysis_types
+                },
+                required=list(analysis_types)
+            )
+        )
+        
+        response = None
+        if pdf_bytes and config.get("try_pdf_input", False):
+            try:
+                response = generate_content(
+                    client,
+                    api_key=api_key,
+                    model=model_name,
+                    contents=[prompt, types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf")],
+                    config=generation_config
+                )
+                processing_method = "direct_pdf"
+            except Exception as e:
+                # Same fallback as analyze_paper: retry with page images
+                logger.warning(f"Batched PDF processing failed: {str(e)}. Falling back to image-based approach.")
+        
+        if response is None:
+            selected_images = select_pages(
+                page_images,
+                max(c.get("max_pages", 15) for c in configs.values()),
+                metadata.get("figure_pages", [])
+            )
+            
+            response = generate_content(
+                client,
+                api_key=api_key,
+                model=model_name,
+                contents=[prompt, *(image_to_part(img) for img in selected_images)],
+                config=generation_config
+            )
+            processing_method = "image_based"
+        
+        outputs = extract_structured_data(response.text)
+        processing_time = time.time() - start_time
+        
+        results = {}
+        for analysis_type in analysis_types:
+            raw_analysis = outputs.get(analysis_type) or ""
+            results[analysis_type] = AnalysisResult(
+                analysis_type=analysis_type,
+                raw_analysis=raw_analysis,
+                model_used=model_name,
+                processing_time=processing_time,
+                sections=extract_all_sections(raw_analysis) if analysis_type == "comprehensive" else {},
+                metadata={
+                    "processing_method": processing_method,
+                    "total_pages": len(page_images),
+                    "pdf_processed": processing_method == "direct_pdf",
+                    "batched_with": list(analysis_types)
+                },
+                error=None if raw_analysis else "Analysis missing from batched response"
+            )
+        
+        logger.info(f"Completed batched analyses {analysis_types} in {processing_time:.2f}s")
+        
+        return results
+        
+    except Exception as e:
+        error_msg = f"Batched analysis failed: {str(e)}"
+        logger.error(error_msg)
+        
+        return {
+            analysis_type: AnalysisResult(
+                analysis_type=analysis_type,
+                raw_analysis="",
+                model_used=model_name,
+                processing_time=time.time() - start_time,
+                error=error_msg
+            )
+            for analysis_type in analysis_types
+        }
+
+
 def process_paper_with_parallel_analysis(
     page_images: List[Image.Image],
     metadata: Dict[str, Any],
     api_key: Optional[str] = None,
     pdf_bytes: Optional[bytes] = None,
-    analysis_types: List[str] = ["comprehensive", "quick_summary", "technical", "practical"]
+    analysis_types: List[str] = ["comprehensive", "quick_summary", "technical", "practical"],
+    on_task_complete: Optional[Callable[[str, int, int], None]] = None,
+    include_terminology: bool = True,
+    include_field_tags: bool = True,
+    batch_analyses: bool = False
 ) -> Dict[str, Any]:
     """
     Process paper with parallel analysis tasks
@@ -555,28 +890,45 @@ def process_paper_with_parallel_analysis(
         api_key: Optional API key
         pdf_bytes: Optional PDF bytes
         analysis_types: List of analysis types to run
+        on_task_complete: Optional callback receiving (task_name, completed, total)
+            as each task finishes, for driving progress displays
+        include_terminology: Whether to extract terminology alongside the analyses
+        include_field_tags: Whether to extract field tags alongside the analyses
+        batch_analyses: Whether to request all analysis types in one Gemini call
+            (see analyze_paper_multi) instead of one call per type
         
     Returns:
         Dictionary of analysis results and metadata
     """
     # Define tasks to run in parallel
-    tasks = {
-        "terminology": lambda: analyze_terminology(page_images, metadata, api_key),
-        "field_tags": lambda: get_field_tags(
+    tasks = {}
+    
+    if include_terminology:
+        tasks["terminology"] = lambda: analyze_terminology(page_images, metadata, api_key)
+    
+    if include_field_tags:
+        tasks["field_tags"] = lambda: get_field_tags(
             metadata.get("title", ""), 
             metadata.get("abstract", ""),
             api_key
         )
-    }
     
     # Add requested analysis types
-    for analysis_type in analysis_types:
-        tasks[analysis_type] = lambda type=analysis_type: analyze_paper(
-            page_images, metadata, type, api_key, pdf_bytes
+    if batch_analyses and len(analysis_types) > 1:
+        tasks["batched_analyses"] = lambda: analyze_paper_multi(
+            page_images, metadata, analysis_types, api_key, pdf_bytes
         )
+    else:
+        for analysis_type in analysis_types:
+            tasks[analysis_type] = lambda type=analysis_type: analyze_paper(
+                page_images, metadata, type, api_key, pdf_bytes
+            )
     
     results = {}
     
+    if not tasks:
+        return results
+    
     # Run tasks in parallel with a thread pool
     with concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks)) as executor:
         # Submit all tasks
@@ -586,24 +938,32 @@ def process_paper_with_parallel_analysis(
         }
         
         # Collect results as they complete
-        for future in concurrent.futures.as_completed(future_to_task):
+        for completed, future in enumerate(concurrent.futures.as_completed(future_to_task), 1):
             task_name = future_to_task[future]
             try:
                 task_result = future.result()
-                results[task_name] = task_result
+                if task_name == "batched_analyses":
+                    results.update(task_result)
+                else:
+                    results[task_name] = task_result
             except Exception as e:
                 logger.error(f"Task {task_name} generated an exception: {str(e)}")
-                if task_name in analysis_types:
+                if task_name in analysis_types or task_name == "batched_analyses":
                     # For analysis tasks, create an error result
-                    results[task_name] = AnalysisResult(
-                        analysis_type=task_name,
-                        raw_analysis="",
-                        model_used="unknown",
-                        processing_time=0,
-                        error=str(e)
-                    )
+                    failed_types = analysis_types if task_name == "batched_analyses" else [task_name]
+                    for failed_type in failed_types:
+                        results[failed_type] = AnalysisResult(
+                            analysis_type=failed_type,
+                            raw_analysis="",
+                            model_used="unknown",
+                            processing_time=0,
+                            error=str(e)
+                        )
                 else:
                     # For other tasks, store an empty result
                     results[task_name] = {} if task_name in ["terminology", "field_tags"] else None
+            
+            if on_task_complete:
+                on_task_complete(task_name, completed, len(tasks))
     
     return results
\ No newline at end of file
@@ -1,8 +1,55 @@
 import streamlit as st
 import re
-from typing import Dict, List, Tuple, Any, Optional
+import html
+from typing import Dict, Tuple, Any, Optional
 from datetime import datetime
-import time
+from functools import lru_cache
+
+# Ratings like "Rating: 7/10", "Rating 7/10", "(7/10)" or a bare "7/10",
+# matched by one compiled pattern so each section is scanned once
+RATING_PATTERN = re.compile(r'(?:Rating:?\s*|\()?(\d+)/10(?!\d)\)?([^\n]*)')
+
+
+@st.cache_data(ttl=24 * 60 * 60, max_entries=32, show_spinner=False)
+def render_paper_header_html(
+    title: str,
+    authors: str,
+    page_count: int,
+    published: Optional[str] = None,
+    arxiv_id: Optional[str] = None,
+    url: Optional[str] = None
+) -> str:
+    """
+    Build the HTML for the paper title and metadata row
+    
+    Args:
+        title: Paper title
+        authors: Author list
+        page_count: Number of pages
+        published: Optional publication date
+        arxiv_id: Optional arXiv identifier
+        url: Optional source URL (used when there is no arXiv ID)
+        
+    Returns:
+        HTML string using the paper-meta classes from assets/custom.css
+    """
+    details = f"<p><b>Pages:</b> {page_count}</p>"
+    if published:
+        details += f"<p><b>Published:</b> {html.escape(published)}</p>"
+    
+    source = ""
+    if arxiv_id:
+        arxiv_id = html.escape(arxiv_id)
+        source = f"<p><b>arXiv ID:</b> <a href='https://arxiv.org/abs/{arxiv_id}'>{arxiv_id}</a></p>"
+    elif url:
+        source = f"<p><b>Source:</b> <a href='{html.escape(url)}'>Link</a></p>"
+    
+    return (
+        f"<div class='paper-meta'><h2>{html.escape(title)}</h2>"
+        f"<div class='meta-row'><div><p><b>Authors:</b> {html.escape(authors)}</p></div>"
+        f"<div>{details}</div><div>{source}</div></div></div>"
+    )
+
 
 def display_tags(tags: Dict[str, Dict[str, str]], container=None):
     """
@@ -99,40 +146,24 @@ def rating_badge(rating: int, tooltip: Optional[str] = None):
     return badge
 
 
-def extract_ratings_from_text(text: str) -> List[Tuple[int, str]]:
+@lru_cache(maxsize=256)
+def extract_rating_from_text(text: str) -> Optional[Tuple[int, str]]:
     """
-    Extract rating scores and context from text
+    Extract the first valid rating score and context from text
     
     Args:
-        text: Text to search for ratings
+        text: Text to search for a rating
         
     Returns:
-        List of (rating, context) tuples
+        (rating, context) tuple or None if no rating is found
     """
-    # Look for patterns like "Rating: 7/10" or "Rating 7/10" or "(7/10)"
-    patterns = [
-        r'Rating:?\s*(\d+)[/]10(.*?)(?=\n|$)',
-        r'\((\d+)[/]10\)(.*?)(?=\n|$)',
-        r'(\d+)[/]10(.*?)(?=\n|$)'
-    ]
-    
-    ratings = []
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.MULTILINE)
-        for match in matches:
-            try:
-                if len(match) >= 2:
-                    rating = int(match[0])
-                    context = match[1].strip()
-                    
-                    # Validate rating range
-                    if 1 <= rating <= 10:
-                        ratings.append((rating, context))
-            except (ValueError, IndexError):
-                continue
+    # Stop at the first valid match rather than scanning the whole section
+    for match in RATING_PATTERN.finditer(text):
+        rating = int(match.group(1))
+        if 1 <= rating <= 10:
+            return rating, match.group(2).strip()
     
-    return ratings
+    return None
 
 
 def display_paper_card(title: str, authors: str, date: Optional[str] = None, preview_image=None):
@@ -174,18 +205,27 @@ def display_terminology(terminology):
     num_cols = min(3, max(1, num_terms))
     cols = st.columns(num_cols)
     
-    for i, (term, info) in enumerate(terminology.items()):
-        with cols[i % num_cols]:
-            # Create a card-style expander for each term
-            with st.expander(term):
-                if isinstance(info, dict):
-                    st.markdown(f"**Definition:** {info.get('definition', 'No definition available')}")
+    # Deal terms out to columns first so each column is entered once
+    column_terms = [[] for _ in range(num_cols)]
+    for i, item in enumerate(terminology.items()):
+        column_terms[i % num_cols].append(item)
+    
+    for col, items in zip(cols, column_terms):
+        with col:
+            for term, info in items:
+                # Create a card-style expander for each term, with its text
+                # sent as a single markdown element
+                with st.expander(term):
+                    if isinstance(info, dict):
+                        text = f"**Definition:** {info.get('definition', 'No definition available')}"
+                        
+                        if 'explanation' in info:
+                            text += f"\n\n**Simplified:** {info.get('explanation')}"
+                    else:
+                        # Handle the case where info might not be a dictionary
+                        text = f"**Definition:** {info}"
                     
-                    if 'explanation' in info:
-                        st.markdown(f"**Simplified:** {info.get('explanation')}")
-                else:
-                    # Handle the case where info might not be a dictionary
-                    st.markdown(f"**Definition:** {info}")
+                    st.markdown(text)
     
     st.markdown("---")
 
@@ -227,9 +267,8 @@ class ProgressManager:
         else:
             self.status_text.error(message)
         
-        # Auto-clear after delay
-        time.sleep(2)
-        self.clear()
+        # No sleep-then-clear here: that would block the script thread. The
+        # elements belong to this run, so Streamlit drops them on the next rerun
     
     def clear(self):
         """Clear the progress elements"""
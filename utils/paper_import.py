@@ -1,19 +1,39 @@
 import os
-import tempfile
+import re
 import base64
+import hashlib
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import arxiv
 import fitz  # PyMuPDF
 from PIL import Image
 import io
-from typing import Dict, List, Optional, Any
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, Any, Iterator
 from dataclasses import dataclass
+from pathlib import Path
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Longest edge (in pixels) of rendered page images
+MAX_IMAGE_DIMENSION = 1500
+
+# Read size for streamed PDF downloads
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Shared HTTP session so repeat downloads reuse pooled keep-alive connections
+# instead of paying a new TCP/TLS handshake per paper
+http_session = requests.Session()
+http_session.headers.update({'User-Agent': 'Mozilla/5.0 PaperBuddy PDF Downloader'})
+http_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+http_session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Shared arXiv API client (Search.results() would build a new one per call)
+arxiv_client = arxiv.Client()
+
 @dataclass
 class PaperContent:
     """Data class for storing paper content and metadata"""
@@ -21,6 +41,8 @@ class PaperContent:
     page_images: List[Image.Image]
     pdf_bytes: Optional[bytes] = None
     pdf_path: Optional[str] = None
+    preview_bytes: Optional[bytes] = None
+    content_hash: Optional[str] = None
     error: Optional[str] = None
     
     @property
@@ -35,92 +57,126 @@ class PaperContent:
     
     def get_pdf_base64(self) -> Optional[str]:
         """Get PDF as base64 for embedding in HTML"""
+        # Base64 output is pure ASCII, which decodes faster than UTF-8
         if self.pdf_bytes:
-            return base64.b64encode(self.pdf_bytes).decode('utf-8')
+            return base64.b64encode(self.pdf_bytes).decode('ascii')
         elif self.pdf_path and os.path.exists(self.pdf_path):
-            with open(self.pdf_path, "rb") as file:
-                return base64.b64encode(file.read()).decode('utf-8')
+            return base64.b64encode(Path(self.pdf_path).read_bytes()).decode('ascii')
         return None
 
 
-def extract_text_from_pdf(doc) -> Dict[str, str]:
+def find_figure_pages(doc) -> List[int]:
     """
-    Extract full text content from PDF document
+    Find pages that embed raster images (figures, plots, photos)
     
     Args:
         doc: PyMuPDF document
         
     Returns:
-        Dictionary with full text and first page text
+        Zero-based indices of pages containing images
     """
-    full_text = ""
-    first_page_text = ""
-    
     try:
-        # Extract text from all pages
-        for i, page in enumerate(doc):
-            page_text = page.get_text()
-            full_text += page_text
-            
-            # Save first page text separately
-            if i == 0:
-                first_page_text = page_text
+        return [i for i, page in enumerate(doc) if page.get_images()]
     except Exception as e:
-        logger.warning(f"Error extracting text from PDF: {str(e)}")
+        logger.warning(f"Error detecting figure pages: {str(e)}")
+        return []
+
+
+def iter_page_images(doc, resolution: int = 150, batch_size: int = 10) -> Iterator[List[Image.Image]]:
+    """
+    Render PDF pages to images in batches
+    
+    Pixmap samples are wrapped directly as PIL images rather than being
+    encoded to PNG and decoded again.
     
-    return {
-        "full_text": full_text,
-        "first_page_text": first_page_text
-    }
+    Args:
+        doc: PyMuPDF document
+        resolution: Target DPI for rendering
+        batch_size: Number of pages per yielded batch
+        
+    Yields:
+        Lists of up to batch_size page images
+    """
+    batch = []
+    
+    for page in doc:
+        # Cap the long edge so oversized pages (posters, slides) never
+        # allocate a bitmap larger than we would ever display or upload
+        zoom = min(resolution / 72, MAX_IMAGE_DIMENSION / max(page.rect.width, page.rect.height))
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        batch.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+        
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    
+    if batch:
+        yield batch
 
 
-def load_pdf_from_path(pdf_path: str) -> PaperContent:
+def create_preview_image(img: Image.Image, width: int = 760, quality: int = 80) -> bytes:
     """
-    Load a PDF from a file path and extract pages as images and metadata.
+    Create a JPEG preview of a page image already scaled to display width
     
     Args:
-        pdf_path: Path to the PDF file
+        img: Page image
+        width: Target width in pixels
+        quality: JPEG quality
+        
+    Returns:
+        Encoded JPEG bytes
+    """
+    height = int(width * img.height / img.width)
+    preview = img.convert("RGB").resize((width, height), Image.LANCZOS)
+    
+    buffer = io.BytesIO()
+    preview.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def load_pdf_from_bytes(pdf_bytes: bytes, filename: str = "paper.pdf") -> PaperContent:
+    """
+    Load a PDF from in-memory bytes and extract pages as images and metadata.
+    
+    Args:
+        pdf_bytes: Raw PDF content
+        filename: Name to record in the metadata
         
     Returns:
         PaperContent object with images and metadata
     """
     try:
-        # Read PDF bytes for future use
-        with open(pdf_path, "rb") as file:
-            pdf_bytes = file.read()
+        # Open the PDF directly from memory; closing it as soon as the pages
+        # are rendered frees MuPDF's page cache instead of waiting for GC
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            # Extract basic metadata
+            metadata = {
+                "title": doc.metadata.get("title", "Unknown Title"),
+                "author": doc.metadata.get("author", "Unknown Author"),
+                "page_count": len(doc),
+                "filename": filename
+            }
             
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-        
-        # Extract basic metadata
-        metadata = {
-            "title": doc.metadata.get("title", "Unknown Title"),
-            "author": doc.metadata.get("author", "Unknown Author"),
-            "page_count": len(doc),
-            "filename": os.path.basename(pdf_path)
-        }
-        
-        # We'll let the AI model extract/enhance metadata rather than using regex
-        # Just store the text for now
-        text_data = extract_text_from_pdf(doc)
-        metadata["first_page_text"] = text_data["first_page_text"]
-        
-        # Extract pages as images with optimized resolution
-        page_images = []
-        resolution = 150  # DPI for images
+            # We'll let the AI model extract/enhance metadata rather than using regex
+            # Just store the first page's text for now; the full text would be
+            # extracted for every page only to be discarded
+            metadata["first_page_text"] = doc.load_page(0).get_text() if len(doc) else ""
+            metadata["figure_pages"] = find_figure_pages(doc)
+            
+            # Extract pages as images with optimized resolution
+            page_images = []
+            for batch in iter_page_images(doc):
+                page_images.extend(batch)
         
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap(matrix=fitz.Matrix(resolution/72, resolution/72))
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
-            page_images.append(img)
+        # Pre-scale the first page so the preview fallback skips resizing on rerun
+        preview_bytes = create_preview_image(page_images[0]) if page_images else None
             
         result = PaperContent(
             metadata=metadata,
             page_images=page_images,
             pdf_bytes=pdf_bytes,
-            pdf_path=pdf_path
+            preview_bytes=preview_bytes,
+            content_hash=hashlib.sha1(pdf_bytes).hexdigest()
         )
         
         return result
@@ -135,6 +191,36 @@ def load_pdf_from_path(pdf_path: str) -> PaperContent:
         )
 
 
+def load_pdf_from_path(pdf_path: str) -> PaperContent:
+    """
+    Load a PDF from a file path and extract pages as images and metadata.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        
+    Returns:
+        PaperContent object with images and metadata
+    """
+    try:
+        # Read the file once; everything downstream works from the bytes
+        with open(pdf_path, "rb") as file:
+            pdf_bytes = file.read()
+    except Exception as e:
+        error_msg = f"Error loading PDF: {str(e)}"
+        logger.error(error_msg)
+        return PaperContent(
+            metadata={"title": "Error Loading PDF", "error": str(e)},
+            page_images=[],
+            error=error_msg
+        )
+    
+    paper_content = load_pdf_from_bytes(pdf_bytes, os.path.basename(pdf_path))
+    if paper_content.is_valid:
+        paper_content.pdf_path = pdf_path
+    
+    return paper_content
+
+
 def load_pdf_from_arxiv(arxiv_id: str) -> PaperContent:
     """
     Download and load a PDF from arXiv using its ID.
@@ -146,12 +232,13 @@ def load_pdf_from_arxiv(arxiv_id: str) -> PaperContent:
         PaperContent object with images and metadata
     """
     try:
-        # Strip version number if present
-        base_id = arxiv_id.split('v')[0] if 'v' in arxiv_id else arxiv_id
+        # Strip version number if present (old-style IDs like solv-int/9901001
+        # contain a 'v' in the archive name, so only strip a trailing vN)
+        base_id = re.sub(r'v\d+$', '', arxiv_id)
         
         # Search for the paper
         search = arxiv.Search(id_list=[base_id])
-        results = list(search.results())
+        results = list(arxiv_client.results(search))
         
         if not results:
             error_msg = f"No paper found with arXiv ID: {arxiv_id}"
@@ -163,13 +250,6 @@ def load_pdf_from_arxiv(arxiv_id: str) -> PaperContent:
             
         paper = results[0]
         
-        # Create a temporary directory to save the PDF
-        temp_dir = tempfile.mkdtemp()
-        pdf_path = os.path.join(temp_dir, f"{base_id}.pdf")
-        
-        # Download the PDF
-        paper.download_pdf(filename=pdf_path)
-        
         # Gather arXiv metadata before loading
         arxiv_metadata = {
             "title": paper.title,
@@ -181,8 +261,11 @@ def load_pdf_from_arxiv(arxiv_id: str) -> PaperContent:
             "source": "arxiv"
         }
         
-        # Load the PDF
-        paper_content = load_pdf_from_path(pdf_path)
+        # Download over the shared session straight into memory
+        response = http_session.get(paper.pdf_url, timeout=30)
+        response.raise_for_status()
+        
+        paper_content = load_pdf_from_bytes(response.content, f"{base_id.replace('/', '_')}.pdf")
         
         # Update with arXiv metadata (taking precedence over PDF metadata)
         paper_content.metadata.update(arxiv_metadata)
@@ -210,17 +293,10 @@ def load_pdf_from_url(url: str) -> PaperContent:
         PaperContent object with images and metadata
     """
     try:
-        # Create a temporary file to save the PDF
-        tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
-        tmp_path = tmp.name
-        
         # Download the PDF with proper error handling
         try:
-            # Set timeout and user agent
-            headers = {
-                'User-Agent': 'Mozilla/5.0 PaperBuddy PDF Downloader'
-            }
-            response = requests.get(url, stream=True, headers=headers, timeout=30)
+            # Set timeout (the shared session supplies the user agent)
+            response = http_session.get(url, stream=True, timeout=30)
             response.raise_for_status()  # Raise exception for HTTP errors
             
             # Check content type to confirm it's a PDF
@@ -228,26 +304,19 @@ def load_pdf_from_url(url: str) -> PaperContent:
             if 'pdf' not in content_type and not url.lower().endswith('.pdf'):
                 raise ValueError(f"URL does not point to a PDF file. Content-Type: {content_type}")
             
-            # Save the PDF to the temporary file
-            for chunk in response.iter_content(chunk_size=8192):
-                tmp.write(chunk)
-            
-            tmp.close()
-            
-            # Get content as bytes for future use
-            with open(tmp_path, "rb") as file:
-                pdf_bytes = file.read()
+            # Collect the body in large chunks and join once; the PDF is opened
+            # from memory, so there is no temporary file to write and read back
+            pdf_bytes = b"".join(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
                 
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to download PDF: {str(e)}")
         
         # Load the PDF
-        paper_content = load_pdf_from_path(tmp_path)
+        paper_content = load_pdf_from_bytes(pdf_bytes, os.path.basename(urlparse(url).path) or "paper.pdf")
         
         # Add URL to metadata
         paper_content.metadata["url"] = url
         paper_content.metadata["source"] = "url"
-        paper_content.pdf_bytes = pdf_bytes
         
         return paper_content
         
@@ -259,30 +328,34 @@ def load_pdf_from_url(url: str) -> PaperContent:
             page_images=[],
             error=error_msg
         )
-    finally:
-        # Always clean up the temporary file
-        try:
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-        except Exception as e:
-            logger.warning(f"Failed to clean up temporary file: {str(e)}")
 
 
-def get_embedded_pdf_viewer(paper_content: PaperContent, height: int = 800) -> Optional[str]:
+def get_embedded_pdf_viewer(
+    paper_content: PaperContent,
+    height: int = 800,
+    pdf_url: Optional[str] = None
+) -> Optional[str]:
     """
     Generate HTML for an embedded PDF viewer with improved zoom and page settings
     
     Args:
         paper_content: PaperContent object
         height: Height of the PDF viewer in pixels
+        pdf_url: Optional URL the PDF is served from; when omitted the PDF is
+            inlined as a base64 data URI
         
     Returns:
         HTML string for the PDF viewer or None if PDF is not available
     """
-    base64_pdf = paper_content.get_pdf_base64()
-    
-    if not base64_pdf:
-        return None
+    if pdf_url:
+        src = pdf_url
+    else:
+        base64_pdf = paper_content.get_pdf_base64()
+        
+        if not base64_pdf:
+            return None
+        
+        src = f"data:application/pdf;base64,{base64_pdf}"
         
     # Create an iframe with the PDF viewer
     # Using URL parameters to set initial view:
@@ -292,7 +365,7 @@ def get_embedded_pdf_viewer(paper_content: PaperContent, height: int = 800) -> O
     pdf_display = f"""
     <div style="display: flex; justify-content: center; width: 100%;">
         <iframe 
-            src="data:application/pdf;base64,{base64_pdf}#page=1&zoom=125&view=FitH" 
+            src="{src}#page=1&zoom=125&view=FitH" 
             width="100%" 
             height="{height}px" 
             style="border: none; box-shadow: 0 2px 5px rgba(0,0,0,0.2);">
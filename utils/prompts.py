@@ -2,7 +2,8 @@
 Prompt templates for different analysis types in PaperBuddy
 """
 
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List
 
 # Base template for all paper analysis
 BASE_ANALYSIS_TEMPLATE = """
@@ -253,6 +254,29 @@ PROMPT_MAPPING = {
     "qa": PAPER_QA_PROMPT
 }
 
+@lru_cache(maxsize=16)
+def get_prompt_template(prompt_type: str) -> str:
+    """
+    Get the paper-independent template for a prompt type
+    
+    Templates built on BASE_ANALYSIS_TEMPLATE have it spliced in once, so
+    each request only needs a single format call with the paper details.
+    
+    Args:
+        prompt_type: Type of prompt
+        
+    Returns:
+        Template string with {title}/{authors}-style placeholders
+    """
+    # Default to comprehensive for unknown types
+    template = PROMPT_MAPPING.get(prompt_type, COMPREHENSIVE_ANALYSIS_PROMPT)
+    
+    if "{base_template}" in template:
+        template = template.replace("{base_template}", BASE_ANALYSIS_TEMPLATE)
+    
+    return template
+
+
 def get_prompt(prompt_type: str, metadata: Dict[str, Any], **kwargs) -> str:
     """
     Get formatted prompt based on type and paper metadata
@@ -268,37 +292,55 @@ def get_prompt(prompt_type: str, metadata: Dict[str, Any], **kwargs) -> str:
     # Get basic metadata with fallbacks
     title = metadata.get("title", "Unknown Title")
     authors = metadata.get("author", "Unknown Authors")
-    abstract = metadata.get("abstract", "")[:500]  # Limit abstract length
     
     # Handle simplified override
     if kwargs.get("simplified", False):
         prompt_type = "simplified"
     
-    # Get prompt template
-    if prompt_type in PROMPT_MAPPING:
-        template = PROMPT_MAPPING[prompt_type]
-    else:
-        # Default to comprehensive for unknown types
-        template = COMPREHENSIVE_ANALYSIS_PROMPT
+    # Get prompt template (base template already spliced in)
+    template = get_prompt_template(prompt_type)
     
-    # Format with base template if needed
-    if "{base_template}" in template:
-        base = BASE_ANALYSIS_TEMPLATE.format(title=title, authors=authors)
-        prompt = template.format(base_template=base)
+    # Handle special case formats
+    if prompt_type == "field_tags":
+        # Only this prompt uses the abstract, so slice it here rather than
+        # on every call
+        abstract = metadata.get("abstract", "")[:500]  # Limit abstract length
+        prompt = template.format(title=title, abstract=abstract)
+    elif prompt_type == "qa":
+        question = kwargs.get("question", "What is the main contribution of this paper?")
+        prompt = template.format(title=title, authors=authors, question=question)
     else:
-        # Handle special case formats
-        if prompt_type == "field_tags":
-            prompt = template.format(title=title, abstract=abstract)
-        elif prompt_type == "qa":
-            question = kwargs.get("question", "What is the main contribution of this paper?")
-            prompt = template.format(title=title, authors=authors, question=question)
-        else:
-            # Standard formatting
-            prompt = template.format(title=title, authors=authors)
+        # Standard formatting
+        prompt = template.format(title=title, authors=authors)
     
     return prompt
 
 
+def get_multi_prompt(prompt_types: List[str], metadata: Dict[str, Any]) -> str:
+    """
+    Get a single prompt requesting several analyses of the same paper
+    
+    Args:
+        prompt_types: Types of analysis to request
+        metadata: Paper metadata dictionary
+        
+    Returns:
+        Formatted prompt string asking for a JSON object keyed by analysis type
+    """
+    parts = [
+        "You will produce several independent analyses of the same research paper.",
+        "Return a JSON object with exactly these keys: "
+        + ", ".join(f'"{prompt_type}"' for prompt_type in prompt_types)
+        + ". Each value is the complete analysis for that key as a markdown string, "
+        "following the instructions in the matching section below."
+    ]
+    
+    for prompt_type in prompt_types:
+        parts.append(f"=== {prompt_type} ===\n{get_prompt(prompt_type, metadata)}")
+    
+    return "\n\n".join(parts)
+
+
 def get_section_markers(analysis_type: str) -> Dict[str, str]:
     """
     Get section markers for extracting content from analysis
@@ -0,0 +1,37 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """Thread-safe token bucket for spacing out API requests"""
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Create a token bucket
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait = (1 - self.tokens) / self.rate
+            
+            # Sleep outside the lock so other threads can refill/check
+            time.sleep(wait)
@@ -0,0 +1,86 @@
+import os
+import time
+import pickle
+import tempfile
+import logging
+from typing import Optional
+
+from config import RESULT_CACHE_DIR, RESULT_CACHE_TTL, get_model_config
+from utils.ai_analysis import AnalysisResult
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _cache_path(paper_hash: str, analysis_type: str, model: str) -> str:
+    """Get the on-disk location for a cached analysis"""
+    return os.path.join(RESULT_CACHE_DIR, f"{paper_hash}_{analysis_type}_{model}.pkl")
+
+
+def get_cached_result(paper_hash: Optional[str], analysis_type: str) -> Optional[AnalysisResult]:
+    """
+    Load a previously stored analysis result from disk
+    
+    Results are keyed on the model the analysis type currently resolves to,
+    so changing the model configuration never serves another model's output,
+    and entries older than RESULT_CACHE_TTL are discarded.
+    
+    Args:
+        paper_hash: Content hash of the paper
+        analysis_type: Type of analysis
+    
+    Returns:
+        Cached AnalysisResult or None if not available
+    """
+    if not paper_hash:
+        return None
+    
+    path = _cache_path(paper_hash, analysis_type, get_model_config(analysis_type).get("model"))
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        if time.time() - os.path.getmtime(path) > RESULT_CACHE_TTL:
+            os.remove(path)
+            return None
+        
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except Exception as e:
+        logger.warning(f"Failed to read cached analysis {path}: {str(e)}")
+        return None
+
+
+def cache_result(paper_hash: Optional[str], result: AnalysisResult) -> None:
+    """
+    Store a successful analysis result on disk
+    
+    Args:
+        paper_hash: Content hash of the paper
+        result: AnalysisResult to store
+    """
+    if not paper_hash or not result or not result.is_successful:
+        return
+    
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        
+        # Write to a uniquely named temporary file first so readers never see
+        # a partial pickle and concurrent writers never share one
+        path = _cache_path(paper_hash, result.analysis_type, result.model_used)
+        with tempfile.NamedTemporaryFile(dir=RESULT_CACHE_DIR, suffix=".tmp", delete=False) as file:
+            tmp_path = file.name
+            try:
+                pickle.dump(result, file)
+            except Exception:
+                file.close()
+                os.unlink(tmp_path)
+                raise
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    except Exception as e:
+        logger.warning(f"Failed to cache analysis: {str(e)}")